@@ -0,0 +1,237 @@
+import itertools
+import numpy as np
+from collections import defaultdict
+from collections import namedtuple
+
+
+def get_corners_and_matrices(objs):
+    count = len(objs)
+    corners  = np.empty((count, 8, 3), dtype=np.float64)
+    matrices = np.empty((count, 4, 4), dtype=np.float64)
+    for i, obj in enumerate(objs):
+        corners[i]  = obj.bound_box
+        matrices[i] = obj.matrix_world
+    return corners, matrices
+
+
+def get_world_corners(objs, corners_and_matrices=None):
+    corners, matrices = corners_and_matrices or get_corners_and_matrices(objs)
+    rotations = matrices[:, :3, :3]
+    locations = matrices[:, None, :3, 3]
+    return np.einsum("nij,nkj->nki", rotations, corners) + locations
+
+
+def get_bounds(objs):
+    world_corners = get_world_corners(list(objs))
+    return np.stack((world_corners.min(axis=1), world_corners.max(axis=1)), axis=1)
+
+
+def get_bounds_table(objs, keys=None):
+    objs = list(objs)
+    rows = {key: i for i, key in enumerate(keys if keys is not None else range(len(objs)))}
+    return BoundsTable(objs, get_bounds(objs), rows)
+
+
+def expand(bounds, offset):
+    return bounds + np.array([-offset, offset])[:, None]
+
+
+def get_aabb_boxes(bounds):
+    centers = bounds.mean(axis=1)
+    axes = np.repeat(np.eye(3)[None], len(bounds), axis=0)
+    halves = (bounds[:, 1] - bounds[:, 0]) / 2
+    return centers, axes, halves
+
+
+def get_obbs(objs):
+    """(centers, axes, halves) of the local bound boxes placed by matrix_world,
+    axes as rows of unit vectors"""
+    objs = list(objs)
+    corners, matrices = get_corners_and_matrices(objs)
+    rotations = matrices[:, :3, :3]
+    local_mins, local_maxs = corners.min(axis=1), corners.max(axis=1)
+    centers = np.einsum("nij,nj->ni", rotations, (local_mins + local_maxs) / 2)
+    centers += matrices[:, :3, 3]
+    scales = np.linalg.norm(rotations, axis=1)
+    axes = (rotations / np.where(scales, scales, 1.0)[:, None]).transpose(0, 2, 1)
+    halves = (local_maxs - local_mins) / 2 * scales
+    # sheared or degenerate matrices keep their world aligned box
+    skewed = np.abs(np.einsum("nid,njd->nij", axes, axes) - np.eye(3)).max(axis=(1, 2)) > 1e-6
+    if skewed.any():
+        world_corners = get_world_corners(objs, (corners, matrices))[skewed]
+        aabbs = np.stack((world_corners.min(axis=1), world_corners.max(axis=1)), axis=1)
+        centers[skewed], axes[skewed], halves[skewed] = get_aabb_boxes(aabbs)
+    return centers, axes, halves
+
+
+def overlap_one_many(bounds, others, inclusive=False):
+    # exclusive matches bboxes_overlap (touching is no overlap),
+    # inclusive matches bboxes_intersect (touching is an intersection)
+    if inclusive:
+        hits = (others[:, 1] >= bounds[0]) & (others[:, 0] <= bounds[1])
+    else:
+        hits = (others[:, 1] >  bounds[0]) & (others[:, 0] <  bounds[1])
+    return hits.all(axis=1)
+
+
+def overlap_rowwise(bounds_a, bounds_b, inclusive=False):
+    if inclusive:
+        hits = (bounds_b[:, 1] >= bounds_a[:, 0]) & (bounds_b[:, 0] <= bounds_a[:, 1])
+    else:
+        hits = (bounds_b[:, 1] >  bounds_a[:, 0]) & (bounds_b[:, 0] <  bounds_a[:, 1])
+    return hits.all(axis=1)
+
+
+def get_sweep_axis(bounds):
+    centers = bounds.mean(axis=1)
+    return int(np.argmax(centers.var(axis=0))) if len(bounds) else 0
+
+
+def sweep_and_prune_pairs(bounds, inclusive=False, axis=None, chunk_size=4096):
+    """overlapping (i, j) row pairs with i < j, each pair once, sorted"""
+    if axis is None:
+        axis = get_sweep_axis(bounds)
+    order = np.argsort(bounds[:, 0, axis], kind="stable")
+    mins = bounds[order, 0, axis]
+    maxs = bounds[order, 1, axis]
+    # every box that starts before the sorted box ends is a candidate
+    ends = np.searchsorted(mins, maxs, side="right" if inclusive else "left")
+    pairs = []
+    for start in range(0, len(order), chunk_size):
+        firsts = np.arange(start, min(start + chunk_size, len(order)))
+        counts = np.maximum(ends[firsts] - firsts - 1, 0)
+        if not counts.sum():
+            continue
+        rows_a = np.repeat(firsts, counts)
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        rows_b = rows_a + 1 + offsets
+        rows_a, rows_b = order[rows_a], order[rows_b]
+        hits = overlap_rowwise(bounds[rows_a], bounds[rows_b], inclusive)
+        pairs.append(np.sort(np.stack((rows_a[hits], rows_b[hits]), axis=1), axis=1))
+    if not pairs:
+        return np.empty((0, 2), dtype=np.int64)
+    pairs = np.concatenate(pairs).astype(np.int64)
+    return pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))]
+
+
+def get_duplicate_labels(bounds, tolerance=0.0):
+    """label per row: lowest row of its duplicate group, -1 if unique"""
+    labels = np.full(len(bounds), -1, dtype=np.int64)
+    if not len(bounds):
+        return labels
+    if tolerance <= 0.0:
+        keys = bounds.reshape(len(bounds), -1)
+        _, first, inverse = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+        group_firsts = first[inverse.ravel()]
+        counts = np.bincount(inverse.ravel())
+        in_group = counts[inverse.ravel()] > 1
+        labels[in_group] = group_firsts[in_group]
+        return labels
+    # boxes within tolerance have min corners at most one cell apart
+    cells = np.floor(bounds[:, 0] / tolerance).astype(np.int64)
+    buckets = defaultdict(list)
+    for row, cell in enumerate(map(tuple, cells)):
+        buckets[cell].append(row)
+    parents = np.arange(len(bounds))
+
+    def find(row):
+        while parents[row] != row:
+            parents[row] = parents[parents[row]]
+            row = parents[row]
+        return row
+
+    for cell, rows in buckets.items():
+        candidates = []
+        for step in NEIGHBOR_STEPS:
+            neighbor = (cell[0] + step[0], cell[1] + step[1], cell[2] + step[2])
+            if neighbor >= cell:  # every bucket pair only once
+                candidates.extend(buckets.get(neighbor, ()))
+        deviation = np.abs(bounds[rows][:, None] - bounds[candidates][None, :])
+        hits = deviation.reshape(len(rows), len(candidates), -1).max(axis=2) <= tolerance
+        for i, j in zip(*np.nonzero(hits)):
+            root_a, root_b = find(rows[i]), find(candidates[j])
+            if root_a != root_b:
+                parents[max(root_a, root_b)] = min(root_a, root_b)
+    roots = np.array([find(row) for row in range(len(bounds))])
+    counts = np.bincount(roots, minlength=len(bounds))
+    in_group = counts[roots] > 1
+    labels[in_group] = roots[in_group]
+    return labels
+
+
+def get_grid_cell_size(bounds):
+    if not len(bounds):
+        return 1.0
+    extents = (bounds[:, 1] - bounds[:, 0]).max(axis=1)
+    return max(float(np.median(extents)) * 2, 0.05)
+
+
+def build_grid(bounds, cell_size=None):
+    if not cell_size:
+        cell_size = get_grid_cell_size(bounds)
+    origin = bounds[:, 0].min(axis=0) if len(bounds) else np.zeros(3)
+    cell_mins = np.floor((bounds[:, 0] - origin) / cell_size).astype(np.int64)
+    cell_maxs = np.floor((bounds[:, 1] - origin) / cell_size).astype(np.int64)
+    cells = defaultdict(list)
+    for row, (cell_min, cell_max) in enumerate(zip(cell_mins, cell_maxs)):
+        for cell in itertools.product(*map(range, cell_min, cell_max + 1)):
+            cells[cell].append(row)
+    cells = {cell: np.array(rows, dtype=np.int64) for cell, rows in cells.items()}
+    return Grid(cell_size, origin, cells, bounds)
+
+
+def query_grid_pairs(grid, bounds, inclusive=False, max_cells=64):
+    """overlapping (query row, grid row) pairs"""
+    cell_mins = np.floor((bounds[:, 0] - grid.origin) / grid.cell_size).astype(np.int64)
+    cell_maxs = np.floor((bounds[:, 1] - grid.origin) / grid.cell_size).astype(np.int64)
+    cell_counts = (cell_maxs - cell_mins + 1).prod(axis=1)
+    all_rows = np.arange(len(grid.bounds))
+    pairs = []
+    for row, (cell_min, cell_max) in enumerate(zip(cell_mins, cell_maxs)):
+        if cell_counts[row] > max_cells:  # large elements test all boxes at once
+            candidates = all_rows
+        else:
+            cell_rows = [
+                grid.cells[cell] for cell in itertools.product(*map(range, cell_min, cell_max + 1))
+                if cell in grid.cells
+            ]
+            if not cell_rows:
+                continue
+            candidates = np.unique(np.concatenate(cell_rows))
+        hits = candidates[overlap_one_many(bounds[row], grid.bounds[candidates], inclusive)]
+        if len(hits):
+            pairs.append(np.stack((np.full(len(hits), row), hits), axis=1))
+    if not pairs:
+        return np.empty((0, 2), dtype=np.int64)
+    return np.concatenate(pairs).astype(np.int64)
+
+
+def obb_overlap_rowwise(centers_a, axes_a, halves_a, centers_b, axes_b, halves_b, eps=1e-9):
+    """separating axis test of oriented boxes, axes given as rows of unit vectors"""
+    rot = np.einsum("kid,kjd->kij", axes_a, axes_b)
+    abs_rot = np.abs(rot) + eps  # robust against parallel edges
+    t = np.einsum("kid,kd->ki", axes_a, centers_b - centers_a)
+    separated = np.zeros(len(rot), dtype=bool)
+    for i in range(3):
+        r_a = halves_a[:, i]
+        r_b = (halves_b * abs_rot[:, i, :]).sum(axis=1)
+        separated |= np.abs(t[:, i]) > r_a + r_b
+    for j in range(3):
+        r_a = (halves_a * abs_rot[:, :, j]).sum(axis=1)
+        r_b = halves_b[:, j]
+        separated |= np.abs((t * rot[:, :, j]).sum(axis=1)) > r_a + r_b
+    for i in range(3):
+        i1, i2 = (i + 1) % 3, (i + 2) % 3
+        for j in range(3):
+            j1, j2 = (j + 1) % 3, (j + 2) % 3
+            r_a = halves_a[:, i1] * abs_rot[:, i2, j] + halves_a[:, i2] * abs_rot[:, i1, j]
+            r_b = halves_b[:, j1] * abs_rot[:, i, j2] + halves_b[:, j2] * abs_rot[:, i, j1]
+            distance = np.abs(t[:, i2] * rot[:, i1, j] - t[:, i1] * rot[:, i2, j])
+            separated |= distance > r_a + r_b
+    return ~separated
+
+
+NEIGHBOR_STEPS = tuple(itertools.product((-1, 0, 1), repeat=3))
+
+BoundsTable = namedtuple("BoundsTable", "objs array rows")
+Grid = namedtuple("Grid", "cell_size origin cells bounds")
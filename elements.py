@@ -0,0 +1,67 @@
+from collections import namedtuple
+from . import utils
+
+
+def new_index():
+    return ElementIndex([], [], [], [], {}, {})
+
+
+def get_ifc_class(elem):
+    # the importer names objects "IfcClass/Name", blender renaming only appends suffixes
+    if "/" not in elem.name:
+        return ""
+    return elem.name.split("/")[0]
+
+
+def add_elems(index, elems, discipline, model=None):
+    """registers elems once and returns their integer rows,
+    elems imported from a model are recorded as its members"""
+    rows = []
+    for elem in elems:
+        pointer = elem.as_pointer()
+        row = index.pointer_rows.get(pointer)
+        if row is None:
+            row = len(index.objs)
+            guid = utils.get_elem_guid(elem)
+            index.objs.append(elem)
+            index.guids.append(guid or elem.name)
+            index.classes.append(get_ifc_class(elem))
+            index.disciplines.append(discipline)
+            index.pointer_rows[pointer] = row
+            if model:
+                index.members.setdefault((discipline, model), []).append(row)
+        rows.append(row)
+    return rows
+
+
+def get_rows(index, elems):
+    # elems not seen at import are registered without discipline
+    return add_elems(index, elems, "")
+
+
+def get_row(index, elem):
+    return get_rows(index, [elem])[0]
+
+
+def get_members(index, discipline, model):
+    rows = index.members.get((discipline, model), ())
+    return [index.objs[row] for row in rows if index.objs[row] is not None]
+
+
+def get_guid(index, elem):
+    return index.guids[get_row(index, elem)]
+
+
+def remove_elems(index, elems):
+    # blender may reuse the memory of deleted objects for new ones
+    for elem in elems:
+        row = index.pointer_rows.pop(elem.as_pointer(), None)
+        if row is None:
+            continue
+        index.objs[row] = None
+
+
+ElementIndex = namedtuple(
+    "ElementIndex",
+    "objs guids classes disciplines pointer_rows members",
+)
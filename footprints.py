@@ -0,0 +1,106 @@
+import numpy as np
+from collections import namedtuple
+from . import bboxes
+
+
+def get_prism(vertices, faces, tolerance):
+    """vertical extrusion of a 2d footprint, None if the mesh is not one"""
+    if not len(faces):
+        return
+    z = vertices[:, 2]
+    bottom, top = z.min(), z.max()
+    if top - bottom <= tolerance:
+        return
+    at_bottom = np.abs(z - bottom) <= tolerance
+    at_top    = np.abs(z - top)    <= tolerance
+    if not (at_bottom | at_top).all():
+        return
+    # slanted sides would give top and bottom different outlines
+    bottom_xy, top_xy = vertices[at_bottom, :2], vertices[at_top, :2]
+    if np.abs(bottom_xy.min(axis=0) - top_xy.min(axis=0)).max() > tolerance or \
+       np.abs(bottom_xy.max(axis=0) - top_xy.max(axis=0)).max() > tolerance:
+        return
+    bottom_faces = faces[at_bottom[faces].all(axis=1)]
+    if not len(bottom_faces):
+        return
+    return Prism(bottom, top, vertices[bottom_faces][:, :, :2])
+
+
+def build_prism_index(objs, prisms):
+    bounds = np.array([
+        (
+            (*prism.triangles.reshape(-1, 2).min(axis=0), prism.bottom),
+            (*prism.triangles.reshape(-1, 2).max(axis=0), prism.top),
+        )
+        for prism in prisms
+    ]).reshape(-1, 2, 3)
+    counts = [len(prism.triangles) for prism in prisms]
+    offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+    triangles = np.concatenate([p.triangles for p in prisms] or [np.empty((0, 3, 2))])
+    return PrismIndex(list(objs), bounds, triangles, offsets, bboxes.build_grid(bounds))
+
+
+def rects_hit_triangles(rect_mins, rect_maxs, triangles):
+    # 2d separating axis test: rect axes and the three triangle edge normals
+    hits = (triangles.max(axis=1) >= rect_mins).all(axis=1) & \
+           (triangles.min(axis=1) <= rect_maxs).all(axis=1)
+    centers = (rect_mins + rect_maxs) / 2
+    halves  = (rect_maxs - rect_mins) / 2
+    for edge in range(3):
+        edges = triangles[:, (edge + 1) % 3] - triangles[:, edge]
+        normals = np.stack((edges[:, 1], -edges[:, 0]), axis=1)
+        projected = np.einsum("kpd,kd->kp", triangles, normals)
+        center = (centers * normals).sum(axis=1)
+        radius = (halves * np.abs(normals)).sum(axis=1)
+        hits &= (projected.max(axis=1) >= center - radius) & \
+                (projected.min(axis=1) <= center + radius)
+    return hits
+
+
+def obbs_hit_triangles(centers, axes, halves, triangles):
+    # xy outline of an oriented box: its edges run along the projected box axes
+    hits = np.ones(len(triangles), dtype=bool)
+    edges = [axes[:, i, :2] for i in range(3)]
+    edges += [triangles[:, (i + 1) % 3] - triangles[:, i] for i in range(3)]
+    for edge in edges:
+        normals = np.stack((edge[:, 1], -edge[:, 0]), axis=1)
+        projected = np.einsum("kpd,kd->kp", triangles, normals)
+        center = (centers[:, :2] * normals).sum(axis=1)
+        radius = (halves * np.abs(np.einsum("kid,kd->ki", axes[:, :, :2], normals))).sum(axis=1)
+        hits &= (projected.max(axis=1) >= center - radius) & \
+                (projected.min(axis=1) <= center + radius)
+    return hits
+
+
+def get_box_prism_pairs(index, bounds, boxes=None):
+    """(box row, prism row) pairs of boxes touching or overlapping a prism,
+    boxes (centers, axes, halves) refine the bounds test to oriented boxes"""
+    pairs = bboxes.query_grid_pairs(index.grid, bounds, inclusive=True)
+    if not len(pairs):
+        return pairs
+    starts = index.offsets[pairs[:, 1]]
+    counts = index.offsets[pairs[:, 1] + 1] - starts
+    pair_rows = np.repeat(np.arange(len(pairs)), counts)
+    tri_rows = np.repeat(starts, counts) + \
+        np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    box_rows = pairs[pair_rows, 0]
+    if boxes is None:
+        hits = rects_hit_triangles(
+            bounds[box_rows, 0, :2],
+            bounds[box_rows, 1, :2],
+            index.triangles[tri_rows],
+        )
+    else:
+        centers, axes, halves = boxes
+        hits = obbs_hit_triangles(
+            centers[box_rows],
+            axes[box_rows],
+            halves[box_rows],
+            index.triangles[tri_rows],
+        )
+    pair_hits = np.bincount(pair_rows[hits], minlength=len(pairs)) > 0
+    return pairs[pair_hits]
+
+
+Prism = namedtuple("Prism", "bottom top triangles")
+PrismIndex = namedtuple("PrismIndex", "objs bounds triangles offsets grid")
@@ -0,0 +1,259 @@
+import bmesh
+import bpy
+import hashlib
+import json
+import numpy as np
+from collections import namedtuple
+from pathlib import Path
+from . import utils
+
+
+def get_mesh_arrays(obj, depsgraph=None):
+    # triangles straight from loop_triangles into flat buffers, no bmesh
+    if depsgraph is None:
+        depsgraph = bpy.context.evaluated_depsgraph_get()
+    obj_eval = obj.evaluated_get(depsgraph)
+    mesh = obj_eval.to_mesh()
+    try:
+        mesh.calc_loop_triangles()
+        vertices = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+        faces = np.empty(len(mesh.loop_triangles) * 3, dtype=np.int32)
+        mesh.vertices.foreach_get("co", vertices)
+        mesh.loop_triangles.foreach_get("vertices", faces)
+    finally:
+        obj_eval.to_mesh_clear()
+    return vertices.reshape(-1, 3), faces.reshape(-1, 3)
+
+
+def get_world_mesh_arrays(obj, depsgraph=None, mesh_cache=None):
+    # world space triangles, local arrays from the mesh cache where given
+    get_local_arrays = mesh_cache.get_mesh_arrays if mesh_cache else get_mesh_arrays
+    vertices, faces = get_local_arrays(obj, depsgraph)
+    matrix = np.array(obj.matrix_world)
+    return vertices @ matrix[:3, :3].T + matrix[:3, 3], faces
+
+
+def get_vertex_array(obj):
+    # raw mesh vertices in local space, without depsgraph evaluation
+    coords = np.empty(len(obj.data.vertices) * 3, dtype=np.float32)
+    obj.data.vertices.foreach_get("co", coords)
+    return coords.reshape(-1, 3).astype(np.float64)
+
+
+def get_tri_proxy_arrays(bounds, offset):
+    # same two diagonal triangles per void as create_tri_proxy, for all voids at once
+    offsets = np.array([offset, offset, 0.0])
+    corners = np.stack((bounds[:, 0] - offsets, bounds[:, 1] + offsets), axis=1)
+    vertices = corners[:, TRI_PROXY_CORNERS, [0, 1, 2]]
+    return vertices, TRI_PROXY_FACES
+
+
+def is_closed(faces):
+    # every edge shared by exactly two triangles
+    edges = np.sort(faces[:, [0, 1, 1, 2, 2, 0]].reshape(-1, 2), axis=1)
+    _, counts = np.unique(edges, axis=0, return_counts=True)
+    return bool(len(counts)) and bool((counts == 2).all())
+
+
+def get_volume(vertices, faces, origin):
+    # relative to an origin near the mesh: georeferenced coordinates lose all precision
+    triangles = vertices[faces].astype(np.float64) - origin
+    return abs(np.einsum(
+        "ki,ki->k",
+        triangles[:, 0],
+        np.cross(triangles[:, 1], triangles[:, 2]),
+    ).sum()) / 6
+
+
+def get_convex_hull(vertices, faces, min_convexity):
+    """hull planes of world space triangles, None for flat or degenerate meshes"""
+    points = np.unique(np.asarray(vertices, dtype=np.float64).round(6), axis=0)
+    if len(points) < 4:
+        return
+    # bmesh stores single precision coordinates, hull around the local origin
+    origin = points.mean(axis=0)
+    bm = bmesh.new()
+    try:
+        for point in points - origin:
+            bm.verts.new(point)
+        result = bmesh.ops.convex_hull(bm, input=bm.verts)
+        bmesh.ops.delete(
+            bm,
+            geom=result["geom_interior"] + result["geom_unused"],
+            context="VERTS",
+        )
+        bm.verts.index_update()
+        hull_vertices = np.array([v.co for v in bm.verts], dtype=np.float64).reshape(-1, 3) + origin
+        hull_faces = np.array(
+            [[v.index for v in tri] for face in bm.faces for tri in triangulate_face(face)],
+            dtype=np.int64,
+        ).reshape(-1, 3)
+    except (RuntimeError, ValueError):
+        return
+    finally:
+        bm.free()
+    if not len(hull_faces):
+        return
+    centroid = hull_vertices.mean(axis=0)
+    triangles = hull_vertices[hull_faces]
+    normals = np.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0])
+    lengths = np.linalg.norm(normals, axis=1)
+    valid = lengths > 1e-12
+    normals = normals[valid] / lengths[valid, None]
+    offsets = (normals * triangles[valid, 0]).sum(axis=1)
+    # orient outwards, independent of the winding bmesh produced
+    flip = (normals * centroid).sum(axis=1) > offsets
+    normals[flip] *= -1
+    offsets[flip] *= -1
+    hull_volume = get_volume(hull_vertices, hull_faces, origin)
+    convex = is_closed(faces) and hull_volume > 0 and \
+        get_volume(vertices, faces, origin) / hull_volume >= min_convexity
+    return Hull(hull_vertices, normals, offsets, convex)
+
+
+def triangulate_face(face):
+    verts = face.verts[:]
+    return [(verts[0], verts[i], verts[i + 1]) for i in range(1, len(verts) - 1)]
+
+
+def get_geometry_hash(obj):
+    # fingerprint of the unevaluated mesh, far cheaper than meshing it
+    mesh = obj.data
+    coords = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    loop_verts = np.empty(len(mesh.loops), dtype=np.int32)
+    loop_totals = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.vertices.foreach_get("co", coords)
+    mesh.loops.foreach_get("vertex_index", loop_verts)
+    mesh.polygons.foreach_get("loop_total", loop_totals)
+    digest = hashlib.blake2b(digest_size=16)
+    for array in (coords, loop_verts, loop_totals):
+        digest.update(array.tobytes())
+    digest.update(str(len(obj.modifiers)).encode())
+    return digest.hexdigest()
+
+
+class MeshCache:
+    """triangulated mesh arrays per model, keyed by GlobalId and geometry hash"""
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.run = 0
+        self.entries = {}  # key: [vertex_start, vertex_count, face_start, face_count, last_run]
+        self.vertices = np.empty((0, 3), dtype=np.float32)
+        self.faces = np.empty((0, 3), dtype=np.int32)
+        self.new_arrays = {}
+        self.files = ("", "")
+        self.load()
+
+    @classmethod
+    def for_model(cls, model_path, max_mb):
+        return cls(model_path.parent / f"{model_path.name}.meshcache", max_mb * 1024 ** 2)
+
+    def load(self):
+        index_path = self.cache_dir / "index.json"
+        if index_path.exists():
+            try:
+                index = json.loads(index_path.read_text())
+                self.vertices = np.load(self.cache_dir / index["vertices"], mmap_mode="r")
+                self.faces = np.load(self.cache_dir / index["faces"], mmap_mode="r")
+            except (OSError, ValueError, KeyError) as err:
+                print(f"mesh cache at {self.cache_dir} unreadable, starting empty: {err}")
+                self.vertices = np.empty((0, 3), dtype=np.float32)
+                self.faces = np.empty((0, 3), dtype=np.int32)
+            else:
+                self.run = index["run"] + 1
+                self.entries = index["entries"]
+                self.files = (index["vertices"], index["faces"])
+        self.remove_stale_files()
+
+    def remove_stale_files(self):
+        # array files the index does not name, e.g. left over while still memory mapped
+        for pattern in ("vertices_*.npy", "faces_*.npy"):
+            for path in self.cache_dir.glob(pattern):
+                if path.name in self.files:
+                    continue
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+
+    def get_mesh_arrays(self, obj, depsgraph=None):
+        key = f"{utils.get_elem_guid(obj) or obj.name}:{get_geometry_hash(obj)}"
+        entry = self.entries.get(key)
+        if entry:
+            self.hits += 1
+            entry[4] = self.run
+            v_start, v_count, f_start, f_count, _ = entry
+            return self.vertices[v_start:v_start + v_count], self.faces[f_start:f_start + f_count]
+        self.misses += 1
+        arrays = self.new_arrays.get(key)
+        if arrays is None:
+            arrays = get_mesh_arrays(obj, depsgraph)
+            self.new_arrays[key] = arrays
+        return arrays
+
+    def report(self, name):
+        total = self.hits + self.misses
+        print(f"{name} mesh cache: {self.hits} hits, {self.misses} misses of {total} meshes")
+
+    def save(self):
+        if not self.entries and not self.new_arrays:
+            return
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        if self.new_arrays:
+            self.write_arrays()
+        index = {
+            "run": self.run,
+            "vertices": self.files[0],
+            "faces": self.files[1],
+            "entries": self.entries,
+        }
+        (self.cache_dir / "index.json").write_text(json.dumps(index))
+
+    def write_arrays(self):
+        arrays = {
+            key: (self.vertices[e[0]:e[0] + e[1]], self.faces[e[2]:e[2] + e[3]], e[4])
+            for key, e in self.entries.items()
+        }
+        arrays.update({key: (*new, self.run) for key, new in self.new_arrays.items()})
+        kept, size = [], 0
+        for key in sorted(arrays, key=lambda k: arrays[k][2], reverse=True):  # most recent first
+            size += arrays[key][0].nbytes + arrays[key][1].nbytes
+            if size > self.max_bytes:
+                break
+            kept.append(key)
+        entries, v_start, f_start = {}, 0, 0
+        for key in kept:
+            vertex_count, face_count = len(arrays[key][0]), len(arrays[key][1])
+            entries[key] = [v_start, vertex_count, f_start, face_count, arrays[key][2]]
+            v_start += vertex_count
+            f_start += face_count
+        vertices = np.concatenate([arrays[k][0] for k in kept] + [self.vertices[:0]])
+        faces = np.concatenate([arrays[k][1] for k in kept] + [self.faces[:0]])
+        evicted = len(arrays) - len(kept)
+        # drop every view of the old memory maps: windows can't delete mapped files
+        del arrays
+        self.vertices, self.faces = vertices, faces
+        self.files = (f"vertices_{self.run}.npy", f"faces_{self.run}.npy")
+        np.save(self.cache_dir / self.files[0], vertices)
+        np.save(self.cache_dir / self.files[1], faces)
+        print(f"mesh cache: stored {len(kept)} meshes, evicted {evicted}")
+        self.entries = entries
+        self.new_arrays = {}
+        self.remove_stale_files()
+
+
+Hull = namedtuple("Hull", "vertices normals offsets convex")
+
+# min (0) / max (1) corner per axis of the six tri proxy vertices
+TRI_PROXY_CORNERS = np.array([
+    [0, 0, 1],
+    [0, 1, 0],
+    [1, 0, 0],
+    [0, 1, 1],
+    [1, 0, 1],
+    [1, 1, 0],
+])
+TRI_PROXY_FACES = np.array([(0, 1, 2), (3, 4, 5)], dtype=np.int32)
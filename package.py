@@ -25,11 +25,15 @@ file_paths = {
     if p.name.endswith(".md")\
     if p.name.endswith("LICENSE")
 }
+# narrow phase module of the spawned workers, kept apart from the add-on modules
+file_paths |= {p.absolute() for p in (ROOT_DIR / "standalone").glob("*.py")}
 
 for file_path in file_paths:
-    shutil.copy(file_path, ADDON / file_path.name)
+    target_path = ADDON / file_path.relative_to(ROOT_DIR.absolute())
+    target_path.parent.mkdir(parents=True, exist_ok=True)
+    shutil.copy(file_path, target_path)
 
 with zipfile.ZipFile(target_zip, 'w') as zip_file:
     for file_path in file_paths:
-        zip_file.write(file_path, arcname=f"{tag}/{file_path.name}")
+        zip_file.write(file_path, arcname=f"{tag}/{file_path.relative_to(ROOT_DIR.absolute()).as_posix()}")
 
@@ -0,0 +1,221 @@
+import itertools
+import numpy as np
+from collections import namedtuple
+from . import bboxes
+
+
+def parse_length(value, scale):
+    try:
+        length = float(value.replace(",", ".")) * scale
+    except (AttributeError, ValueError):
+        return None
+    return length if length > 0 else None
+
+
+def get_void_dimensions(void, scale):
+    pset = void.BIMObjectProperties.psets.get("Pset_ProvisionForVoid")
+    if not pset:
+        return
+    values = {}
+    for key in ("Shape", "Width", "Height", "Depth", "Diameter"):
+        prop = pset.properties.get(key)
+        values[key] = prop.string_value if prop else ""
+    depth    = parse_length(values["Depth"],    scale)
+    width    = parse_length(values["Width"],    scale)
+    height   = parse_length(values["Height"],   scale)
+    diameter = parse_length(values["Diameter"], scale)
+    shape = values["Shape"].lower()
+    is_round = diameter and (any(s in shape for s in ROUND_SHAPES) or not (width and height))
+    if not depth:
+        return
+    if is_round:
+        return VoidDimensions("cylinder", diameter, diameter, depth)
+    if width and height:
+        return VoidDimensions("box", width, height, depth)
+
+
+def get_local_frame(obj):
+    matrix  = np.array(obj.matrix_world, dtype=np.float64)
+    corners = np.array(obj.bound_box, dtype=np.float64)
+    local_min, local_max = corners.min(axis=0), corners.max(axis=0)
+    center = matrix[:3, :3] @ ((local_min + local_max) / 2) + matrix[:3, 3]
+    scales = np.linalg.norm(matrix[:3, :3], axis=0)
+    axes = (matrix[:3, :3] / np.where(scales, scales, 1.0)).T  # rows: unit local axes
+    extents = (local_max - local_min) * scales
+    return center, axes, extents
+
+
+def get_void_primitive(void, scale, tolerance, offset=0.0):
+    """oriented box or cylinder from the void pset dimensions, None if they don't fit,
+    grown by offset along its horizontal axes like the tri proxy"""
+    dimensions = get_void_dimensions(void, scale)
+    if not dimensions:
+        return
+    center, axes, extents = get_local_frame(void)
+    wanted = np.array(dimensions[1:])
+    best_order, best_deviation = None, None
+    for order in itertools.permutations(range(3)):
+        deviation = np.abs(extents[list(order)] - wanted).max()
+        if best_deviation is None or deviation < best_deviation:
+            best_order, best_deviation = order, deviation
+    if best_deviation > tolerance:
+        return
+    # depth axis last, so that axes[2] is the cylinder axis
+    axes = axes[list(best_order)]
+    growth = get_growth(dimensions.shape, axes, offset)
+    return VoidPrimitive(dimensions.shape, center, axes, wanted / 2 + growth)
+
+
+def get_growth(shape, axes, offset):
+    # the tri proxy grows the void bbox in x and y, so an axis grows by its horizontal part
+    growth = offset * np.linalg.norm(axes[..., :2], axis=-1)
+    if shape == "cylinder":
+        growth[:2] = growth[:2].max()
+    return growth
+
+
+def get_box_triangles(primitive):
+    local = BOX_CORNERS * primitive.half_extents
+    vertices = primitive.center + local @ primitive.axes
+    return vertices, BOX_FACES
+
+
+def get_cylinder_triangles(primitive, segments):
+    radius = primitive.half_extents[0] / np.cos(np.pi / segments)  # circumscribed
+    half_depth = primitive.half_extents[2]
+    angles = np.arange(segments) * 2 * np.pi / segments
+    ring = np.stack((np.cos(angles) * radius, np.sin(angles) * radius), axis=1)
+    bottom = np.column_stack((ring, np.full(segments, -half_depth)))
+    top    = np.column_stack((ring, np.full(segments,  half_depth)))
+    caps = np.array([[0, 0, -half_depth], [0, 0, half_depth]])
+    inner = np.array([
+        [-radius, 0, -half_depth],
+        [ radius, 0, -half_depth],
+        [ radius, 0,  half_depth],
+        [-radius, 0,  half_depth],
+    ])
+    local = np.concatenate((bottom, top, caps, inner))
+    i = np.arange(segments)
+    j = (i + 1) % segments
+    n = segments
+    faces = np.concatenate((
+        np.stack((i, j, n + j), axis=1),
+        np.stack((i, n + j, n + i), axis=1),
+        np.stack((np.full(n, 2 * n), j, i), axis=1),
+        np.stack((np.full(n, 2 * n + 1), n + i, n + j), axis=1),
+        np.array([[2 * n + 2, 2 * n + 3, 2 * n + 4], [2 * n + 2, 2 * n + 4, 2 * n + 5]]),
+    )).astype(np.int32)
+    vertices = primitive.center + local @ primitive.axes
+    return vertices, faces
+
+
+def get_primitive_triangles(primitive, segments=32):
+    # closed surface plus inner triangles, which catch elements fully inside the void
+    if primitive.shape == "cylinder":
+        return get_cylinder_triangles(primitive, segments)
+    return get_box_triangles(primitive)
+
+
+def get_boxes(void_primitives, boxes):
+    # oriented box per void: the primitive itself, the bounding prism
+    # of a cylinder or the given fallback box of everything else
+    centers, axes, halves = (array.copy() for array in boxes)
+    for row, primitive in enumerate(void_primitives):
+        if primitive:
+            centers[row], axes[row], halves[row] = primitive[1:]
+    return centers, axes, halves
+
+
+def get_segment_primitive(obj, vertices, tolerance):
+    """straight extruded round or rectangular segment, None for anything else"""
+    if not len(vertices):
+        return
+    matrix = np.array(obj.matrix_world, dtype=np.float64)
+    if not np.allclose(np.linalg.norm(matrix[:3, :3], axis=0), 1.0, atol=1e-6):
+        return
+    local_min, local_max = vertices.min(axis=0), vertices.max(axis=0)
+    local_center = (local_min + local_max) / 2
+    half = (local_max - local_min) / 2
+    offsets = vertices - local_center
+    for axis in np.argsort(-half):  # longest axis first
+        if half[axis] <= tolerance:
+            continue
+        # an extrusion only has vertices on its two end caps
+        if (np.abs(np.abs(offsets[:, axis]) - half[axis]) > tolerance).any():
+            continue
+        cross = [k for k in range(3) if k != axis]
+        u, v = offsets[:, cross[0]], offsets[:, cross[1]]
+        radii = np.hypot(u, v)
+        # rectangle corners are equidistant as well, so check them first
+        if ((np.abs(np.abs(u) - half[cross[0]]) <= tolerance) &
+                (np.abs(np.abs(v) - half[cross[1]]) <= tolerance)).all():
+            shape = "box"
+            halves = half[[cross[0], cross[1], axis]]
+        elif radii.max() - radii.min() <= tolerance:
+            shape = "cylinder"
+            halves = np.array([radii.max(), radii.max(), half[axis]])
+        else:
+            continue
+        axes = np.eye(3)[[cross[0], cross[1], axis]] @ matrix[:3, :3].T
+        center = matrix[:3, :3] @ local_center + matrix[:3, 3]
+        return SegmentPrimitive(shape, center, axes, halves)
+
+
+def get_segment_box_distances(starts, ends, centers, axes, halves, iterations=40):
+    # distance to a box is convex along the segment: golden section search
+    local_starts = np.einsum("kid,kd->ki", axes, starts - centers)
+    local_ends   = np.einsum("kid,kd->ki", axes, ends   - centers)
+
+    def distances(t):
+        points = local_starts + (local_ends - local_starts) * t[:, None]
+        return np.linalg.norm(np.maximum(np.abs(points) - halves, 0.0), axis=1)
+
+    ratio = (np.sqrt(5) - 1) / 2
+    low, high = np.zeros(len(starts)), np.ones(len(starts))
+    for _ in range(iterations):
+        left  = high - ratio * (high - low)
+        right = low  + ratio * (high - low)
+        left_smaller = distances(left) < distances(right)
+        high = np.where(left_smaller, right, high)
+        low  = np.where(left_smaller, low, left)
+    candidates = (low, high, np.zeros_like(low), np.ones_like(low))
+    return np.min([distances(t) for t in candidates], axis=0)
+
+
+def segments_hit_boxes(segments, box_centers, box_axes, box_halves):
+    """one segment primitive per void box, both given per candidate pair"""
+    centers = np.array([s.center for s in segments]).reshape(-1, 3)
+    axes    = np.array([s.axes   for s in segments]).reshape(-1, 3, 3)
+    halves  = np.array([s.half_extents for s in segments]).reshape(-1, 3)
+    hits = bboxes.obb_overlap_rowwise(box_centers, box_axes, box_halves, centers, axes, halves)
+    # cylinders: inside their prism and within radius of the axis (capsule)
+    is_round = np.array([s.shape == "cylinder" for s in segments], dtype=bool)
+    if is_round.any():
+        axis_offsets = axes[is_round, 2] * halves[is_round, 2:3]
+        distances = get_segment_box_distances(
+            centers[is_round] - axis_offsets,
+            centers[is_round] + axis_offsets,
+            box_centers[is_round],
+            box_axes[is_round],
+            box_halves[is_round],
+        )
+        hits[is_round] &= distances <= halves[is_round, 0]
+    return hits
+
+
+ROUND_SHAPES = ("round", "rund", "circ", "kreis")
+
+BOX_CORNERS = np.array(list(itertools.product((-1.0, 1.0), repeat=3)))
+BOX_FACES = np.array([
+    (0, 1, 3), (0, 3, 2),  # -x
+    (4, 6, 7), (4, 7, 5),  # +x
+    (0, 4, 5), (0, 5, 1),  # -y
+    (2, 3, 7), (2, 7, 6),  # +y
+    (0, 2, 6), (0, 6, 4),  # -z
+    (1, 5, 7), (1, 7, 3),  # +z
+    (1, 2, 4), (3, 6, 5),  # inner diagonal triangles like the tri proxy
+], dtype=np.int32)
+
+VoidDimensions = namedtuple("VoidDimensions", "shape width height depth")
+VoidPrimitive = namedtuple("VoidPrimitive", "shape center axes half_extents")
+SegmentPrimitive = namedtuple("SegmentPrimitive", "shape center axes half_extents")
@@ -0,0 +1,82 @@
+# void-void bbox check: compare every void with every other void
+# instead of sweep and prune (only meant to verify the sweep results)
+VOID_VOID_BRUTE_FORCE = False
+
+# void bboxes whose corners all deviate less than this (m) count as duplicates
+VOID_DUPLICATE_TOLERANCE = 0.0005
+
+# grid cell size (m) of the void collision bounds index, None derives it from the void sizes
+VOID_GRID_CELL_SIZE = None
+
+# engineering models with at least this many elements get their elements
+# outside the void collision bounds (incl. proxy offset) deleted before the collision check
+CULL_NON_COLLIDING_MIN_ELEMS = 2000
+
+# triangulated discipline meshes are cached next to each ifc model
+# in <model>.ifc.meshcache, the least recently used ones beyond the size limit are evicted
+MESH_CACHE = True
+MESH_CACHE_MAX_MB = 1024
+
+# xy offset (m) of the two triangle void proxies used for the collision check.
+# analytic void boxes and cylinders grow by it along their horizontal axes,
+# mesh fallback voids only in their bounds and oriented boxes, not their triangles
+VOID_PROXY_OFFSET = 0.03
+
+# additionally create the void proxies as blender objects for visual debugging
+DEBUG_VOID_PROXY_OBJECTS = False
+
+# void geometry for the collision check:
+# "analytic": oriented boxes / cylinders from the Pset_ProvisionForVoid dimensions,
+#             falling back to the void mesh where those are missing or don't fit
+# "tri_proxy": two diagonal triangles spanning the void bbox
+VOID_GEOMETRY = "analytic"
+# factor from the pset length unit to blender units (mm -> m)
+VOID_DIMENSION_SCALE = 0.001
+# max deviation (m) of pset dimensions from the void mesh extents
+VOID_DIMENSION_TOLERANCE = 0.01
+VOID_CYLINDER_SEGMENTS = 32
+
+# straight IfcFlowSegment pipes and ducts are tested analytically as cylinders /
+# rectangular prisms against the void boxes instead of going through mesh collision
+SEGMENT_FAST_PATH = True
+# max deviation (m) of segment vertices from an ideal straight extrusion
+SEGMENT_TOLERANCE = 0.002
+
+# spaces that are vertical extrusions of a footprint are matched to the voids
+# by a box in prism lookup instead of mesh collision
+ROOM_FOOTPRINT_LOOKUP = True
+# void boxes are grown by this (m), so voids in a wall find the rooms on both sides
+ROOM_VOID_OFFSET = 0.03
+# max deviation (m) of vertices from the bottom / top elevation of a prism
+FOOTPRINT_TOLERANCE = 0.002
+
+# walls that are vertical extrusions of a footprint are matched to the oriented
+# void boxes by their footprint, walls with other geometry go through mesh collision
+WALL_FOOTPRINT_LOOKUP = True
+
+# aabb candidate pairs are additionally tested as oriented boxes
+# (local bound box placed by matrix_world), which drops most false positives
+# of rotated voids, angled walls and inclined ducts
+OBB_BROAD_PHASE = True
+
+# narrow phase engine, see narrowphase.BACKENDS:
+# "fcl_pairs": python-fcl per candidate pair, first contact only, no contact data
+# "fcl": void and element managers through the collision module with contact data
+# "numpy": void boxes against element triangles, no native dependency
+COLLISION_BACKEND = "fcl_pairs"
+# name of a second backend to run on the same pairs, mismatching pairs are reported
+COLLISION_DIFFERENTIAL = None
+
+# narrow phase worker processes, 1 runs in the blender process, None uses all cores.
+# pairs are evaluated in chunks of NARROW_PHASE_CHUNK_SIZE, fewer pairs stay in process.
+# workers need python 3.8 (multiprocessing.shared_memory), older blenders stay in process
+NARROW_PHASE_WORKERS = 1
+NARROW_PHASE_CHUNK_SIZE = 2000
+# python executable of the workers, None uses sys.executable
+NARROW_PHASE_PYTHON = None
+
+# candidate pairs are first tested against the convex hull of the element:
+# voids outside the hull are dropped, voids inside the hull of a closed element
+# whose volume is at least HULL_MIN_CONVEXITY of its hull volume are accepted
+HULL_CASCADE = True
+HULL_MIN_CONVEXITY = 0.95
@@ -0,0 +1,285 @@
+import multiprocessing
+import numpy as np
+from collections import namedtuple
+
+# no bpy and no package relative imports: this module is also loaded on its own
+
+
+def pack_meshes(meshes):
+    """world space (vertices, faces) per element as one vertex and one face array"""
+    vertex_counts = [len(vertices) for vertices, _ in meshes]
+    face_counts   = [len(faces)    for _, faces    in meshes]
+    vertex_offsets = np.concatenate(([0], np.cumsum(vertex_counts))).astype(np.int64)
+    face_offsets   = np.concatenate(([0], np.cumsum(face_counts))).astype(np.int64)
+    vertices = np.concatenate(
+        [np.asarray(v, dtype=np.float64) for v, _ in meshes] or [np.empty((0, 3))]
+    )
+    faces = np.concatenate(
+        [np.asarray(f, dtype=np.int64) + vertex_offsets[i] for i, (_, f) in enumerate(meshes)]
+        or [np.empty((0, 3), dtype=np.int64)]
+    )
+    return PackedMeshes(vertices, faces, vertex_offsets, face_offsets)
+
+
+def get_packed_mesh(packed, row):
+    vertex_start, vertex_end = packed.vertex_offsets[row:row + 2]
+    face_start, face_end = packed.face_offsets[row:row + 2]
+    vertices = packed.vertices[vertex_start:vertex_end]
+    faces = packed.faces[face_start:face_end] - vertex_start
+    return vertices, faces
+
+
+def boxes_hit_triangles(centers, axes, halves, triangles):
+    """separating axis test of oriented boxes against triangles, row by row"""
+    # triangles in the box frame, the box becomes centered and axis aligned
+    local = np.einsum("kid,kpd->kpi", axes, triangles - centers[:, None])
+    hits = ((local.max(axis=1) >= -halves) & (local.min(axis=1) <= halves)).all(axis=1)
+    edges = np.stack((
+        local[:, 1] - local[:, 0],
+        local[:, 2] - local[:, 1],
+        local[:, 0] - local[:, 2],
+    ), axis=1)
+    normals = np.cross(edges[:, 0], edges[:, 1])
+    distance = np.abs((local[:, 0] * normals).sum(axis=1))
+    hits &= distance <= (halves * np.abs(normals)).sum(axis=1)
+    for i in range(3):
+        for j in range(3):
+            axis = np.cross(np.eye(3)[i], edges[:, j])
+            projected = np.einsum("kpd,kd->kp", local, axis)
+            radius = (halves * np.abs(axis)).sum(axis=1)
+            hits &= (projected.min(axis=1) <= radius) & (projected.max(axis=1) >= -radius)
+    return hits
+
+
+def boxes_vs_hull(centers, axes, halves, hull_vertices, normals, offsets):
+    """per oriented box: separated from the convex hull, fully inside the hull"""
+    # box extent along every hull plane normal
+    radii = np.einsum("kid,fd->kfi", axes, normals)
+    radii = (np.abs(radii) * halves[:, None]).sum(axis=2)
+    distances = centers @ normals.T - offsets
+    separated = (distances - radii > 0).any(axis=1)
+    inside = (distances + radii <= 0).all(axis=1)
+    # hull extent along the box axes
+    projected = np.einsum("kid,vd->kiv", axes, hull_vertices)
+    box_centers = np.einsum("kid,kd->ki", axes, centers)
+    separated |= ((projected.min(axis=2) > box_centers + halves) |
+                  (projected.max(axis=2) < box_centers - halves)).any(axis=1)
+    return separated, inside
+
+
+def get_pair_triangle_rows(packed, pair_elem_rows):
+    starts = packed.face_offsets[pair_elem_rows]
+    counts = packed.face_offsets[pair_elem_rows + 1] - starts
+    pair_rows = np.repeat(np.arange(len(pair_elem_rows)), counts)
+    face_rows = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+    return pair_rows, face_rows
+
+
+class NumpyBackend:
+    """voids as oriented boxes against element triangles, no native dependency"""
+    name = "numpy"
+
+    def __init__(self, void_meshes, void_boxes, chunk_triangles=1 << 20):
+        self.centers, self.axes, self.halves = void_boxes
+        self.chunk_triangles = chunk_triangles
+
+    def get_hits(self, elems, pairs):
+        hits = np.zeros(len(pairs), dtype=bool)
+        counts = elems.face_offsets[pairs[:, 1] + 1] - elems.face_offsets[pairs[:, 1]]
+        ends = np.cumsum(counts)
+        start = 0
+        while start < len(pairs):
+            limit = ends[start] - counts[start] + self.chunk_triangles
+            end = max(int(np.searchsorted(ends, limit, side="right")), start + 1)
+            chunk = pairs[start:end]
+            pair_rows, face_rows = get_pair_triangle_rows(elems, chunk[:, 1])
+            void_rows = chunk[pair_rows, 0]
+            triangle_hits = boxes_hit_triangles(
+                self.centers[void_rows],
+                self.axes[void_rows],
+                self.halves[void_rows],
+                elems.vertices[elems.faces[face_rows]],
+            )
+            hits[start:end] = np.bincount(pair_rows[triangle_hits], minlength=len(chunk)) > 0
+            start = end
+        return hits
+
+
+class FclBackend:
+    """void and element triangle meshes through the fcl collision manager"""
+    name = "fcl"
+
+    def __init__(self, void_meshes, void_boxes):
+        import collision
+        import ifcclash
+        self.collision = collision
+        self.ifcclash = ifcclash
+        self.void_cm = self.get_collision_manager(
+            lambda row: void_meshes[row],
+            range(len(void_meshes)),
+            "void",
+        )
+
+    def get_collision_manager(self, get_mesh, rows, prefix):
+        cm = self.collision.CollisionManager()
+        identity = np.eye(4)
+        for row in rows:
+            mesh = self.ifcclash.Mesh()
+            mesh.vertices, mesh.faces = get_mesh(row)
+            cm.add_object(f"{prefix}:{row}", mesh, identity)
+        return cm
+
+    def get_hits(self, elems, pairs):
+        elem_cm = self.get_collision_manager(
+            lambda row: get_packed_mesh(elems, row),
+            np.unique(pairs[:, 1]),
+            "elem",
+        )
+        _, contacts = self.void_cm.in_collision_other(elem_cm, return_data=True)
+        contact_pairs = set()
+        for contact in contacts:
+            rows = dict(name.split(":") for name in contact.names)
+            if "void" in rows and "elem" in rows:
+                contact_pairs.add((int(rows["void"]), int(rows["elem"])))
+        return np.array([tuple(pair) in contact_pairs for pair in pairs.tolist()], dtype=bool)
+
+
+class FclPairBackend:
+    """collision test per candidate pair straight through python-fcl,
+    stops at the first contact and generates no contact data"""
+    name = "fcl_pairs"
+
+    def __init__(self, void_meshes, void_boxes):
+        import fcl
+        self.fcl = fcl
+        self.request = fcl.CollisionRequest(num_max_contacts=1, enable_contact=False)
+        self.void_objs = [self.get_collision_object(*mesh) for mesh in void_meshes]
+
+    def get_collision_object(self, vertices, faces):
+        model = self.fcl.BVHModel()
+        model.beginModel(num_tris_=len(faces), num_vertices_=len(vertices))
+        model.addSubModel(
+            verts=np.asarray(vertices, dtype=np.float64),
+            triangles=np.asarray(faces, dtype=np.int32),
+        )
+        model.endModel()
+        return self.fcl.CollisionObject(model, self.fcl.Transform())
+
+    def get_hits(self, elems, pairs):
+        elem_objs = {
+            row: self.get_collision_object(*get_packed_mesh(elems, row))
+            for row in np.unique(pairs[:, 1]).tolist()
+        }
+        hits = np.zeros(len(pairs), dtype=bool)
+        for i, (void_row, elem_row) in enumerate(pairs.tolist()):
+            result = self.fcl.CollisionResult()
+            hits[i] = self.fcl.collide(
+                self.void_objs[void_row],
+                elem_objs[elem_row],
+                self.request,
+                result,
+            ) > 0
+        return hits
+
+
+def get_backend(name, void_meshes, void_boxes):
+    return BACKENDS[name](void_meshes, void_boxes)
+
+
+def get_mismatches(pairs, hits, other_hits):
+    """mismatching pairs and the hits of the first backend for them"""
+    mismatching = hits != other_hits
+    return pairs[mismatching], hits[mismatching]
+
+
+def has_shared_memory():
+    # multiprocessing.shared_memory needs python 3.8, blender 2.9x bundles 3.7
+    try:
+        from multiprocessing import shared_memory
+    except ImportError:
+        return False
+    return True
+
+
+def share_arrays(arrays):
+    """copy named arrays into shared memory blocks, returns the blocks and
+    a picklable description to attach to them from other processes"""
+    from multiprocessing import shared_memory
+    blocks, description = [], {}
+    for key, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, array.dtype, buffer=block.buf)[...] = array
+        blocks.append(block)
+        description[key] = (block.name, array.shape, array.dtype.str)
+    return blocks, description
+
+
+def attach_arrays(description):
+    from multiprocessing import shared_memory
+    blocks, arrays = [], {}
+    for key, (name, shape, dtype) in description.items():
+        # spawned workers share the resource tracker of the publishing
+        # process, which unlinks the block once all chunks are done
+        block = shared_memory.SharedMemory(name=name)
+        blocks.append(block)
+        arrays[key] = np.ndarray(shape, dtype, buffer=block.buf)
+    return blocks, arrays
+
+
+def get_worker_backend(backend_name, description):
+    # attached once per worker process and reused by all of its chunks
+    key = (backend_name, tuple(name for name, _, _ in description.values()))
+    if key not in worker_state:
+        blocks, arrays = attach_arrays(description)
+        voids = PackedMeshes(*(arrays[f"void_{field}"] for field in PackedMeshes._fields))
+        elems = PackedMeshes(*(arrays[f"elem_{field}"] for field in PackedMeshes._fields))
+        void_meshes = [get_packed_mesh(voids, row) for row in range(len(voids.face_offsets) - 1)]
+        void_boxes = arrays["box_centers"], arrays["box_axes"], arrays["box_halves"]
+        backend = get_backend(backend_name, void_meshes, void_boxes)
+        worker_state[key] = blocks, backend, elems
+    _, backend, elems = worker_state[key]
+    return backend, elems
+
+
+def get_chunk_hits(task):
+    backend_name, description, pairs = task
+    backend, elems = get_worker_backend(backend_name, description)
+    return backend.get_hits(elems, pairs)
+
+
+def get_hits_parallel(backend_name, void_meshes, void_boxes, elems, pairs,
+                      workers, chunk_size, executable=None):
+    """backend hits of the pairs, evaluated in chunks by a spawned process pool,
+    merged in pair order"""
+    voids = pack_meshes(void_meshes)
+    arrays = {f"void_{field}": value for field, value in zip(PackedMeshes._fields, voids)}
+    arrays.update({f"elem_{field}": value for field, value in zip(PackedMeshes._fields, elems)})
+    arrays.update(zip(("box_centers", "box_axes", "box_halves"), void_boxes))
+    blocks, description = share_arrays(arrays)
+    try:
+        tasks = [
+            (backend_name, description, pairs[start:start + chunk_size])
+            for start in range(0, len(pairs), chunk_size)
+        ]
+        context = multiprocessing.get_context("spawn")
+        if executable:
+            context.set_executable(executable)
+        with context.Pool(processes=min(workers, len(tasks))) as pool:
+            chunk_hits = pool.map(get_chunk_hits, tasks, chunksize=1)
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+    return np.concatenate(chunk_hits or [np.zeros(0, dtype=bool)])
+
+
+BACKENDS = {
+    "fcl"      : FclBackend,
+    "fcl_pairs": FclPairBackend,
+    "numpy"    : NumpyBackend,
+}
+
+worker_state = {}
+
+PackedMeshes = namedtuple("PackedMeshes", "vertices faces vertex_offsets face_offsets")
@@ -0,0 +1,77 @@
+import re
+import numpy as np
+from pathlib import Path
+from . import bboxes
+
+
+def get_ifc_file(model_path):
+    # the blenderbim importer keeps the model it just parsed open, reuse it
+    try:
+        from blenderbim.bim.ifc import IfcStore
+        store_path = getattr(IfcStore, "path", "")
+        if IfcStore.file and store_path and Path(store_path).resolve() == Path(model_path).resolve():
+            return IfcStore.file
+    except (ImportError, AttributeError, OSError):
+        pass
+    import ifcopenshell
+    print(f"parsing {model_path.name} again for its spatial containment")
+    return ifcopenshell.open(str(model_path))
+
+
+def get_enclosing_storey(structure):
+    # spaces and other spatial elements are aggregated into their storey
+    while structure is not None and not structure.is_a("IfcBuildingStorey"):
+        parents = [rel.RelatingObject for rel in structure.Decomposes or ()]
+        structure = parents[0] if parents else None
+    return structure
+
+
+def get_contained_storeys(model_path):
+    """GlobalId -> storey name from IfcRelContainedInSpatialStructure"""
+    try:
+        ifc_file = get_ifc_file(model_path)
+    except (ImportError, OSError, RuntimeError) as error:
+        print(f"no spatial containment read from {model_path.name}: {error}")
+        return {}
+    storeys = {}
+    for rel in ifc_file.by_type("IfcRelContainedInSpatialStructure"):
+        storey = get_enclosing_storey(rel.RelatingStructure)
+        if storey is None:
+            continue
+        name = f"{STOREY_PREFIX}{storey.Name}"
+        for elem in rel.RelatedElements:
+            storeys[elem.GlobalId] = name
+    return storeys
+
+
+def get_binned_storeys(elems, guids, storey_objs):
+    # elem centroid z against the sorted storey elevations
+    if not elems or not storey_objs:
+        return {}
+    elevations = np.array([obj.matrix_world.translation.z for obj in storey_objs])
+    order = np.argsort(elevations, kind="stable")
+    names = [BLENDER_SUFFIX.sub("", storey_objs[i].name) for i in order]
+    centroids = bboxes.get_bounds(elems).mean(axis=1)[:, 2]
+    rows = np.searchsorted(elevations[order], centroids, side="right") - 1
+    rows = np.clip(rows, 0, None)  # below the lowest storey
+    return {guid: names[row] for guid, row in zip(guids, rows)}
+
+
+def get_storey_map(model_path, elems, guids, storey_objs):
+    """GlobalId -> "IfcBuildingStorey/Name" of the given elems"""
+    contained = get_contained_storeys(model_path)
+    missing = [(elem, guid) for elem, guid in zip(elems, guids) if guid not in contained]
+    binned = get_binned_storeys(
+        [elem for elem, _ in missing],
+        [guid for _, guid in missing],
+        storey_objs,
+    )
+    storeys = {guid: contained[guid] for guid in guids if guid in contained}
+    storeys.update(binned)
+    print(f"storeys: {len(storeys) - len(binned)} from spatial containment, "
+          f"{len(binned)} by elevation, {len(guids) - len(storeys)} without storey")
+    return storeys
+
+
+STOREY_PREFIX = "IfcBuildingStorey/"
+BLENDER_SUFFIX = re.compile(r"\.\d{3}$")
@@ -1,4 +1,5 @@
 import bpy
+import collections
 import datetime
 import re
 
@@ -34,23 +35,37 @@ def add_custom_pset_key_value(elem, name_pset, key, value, concat=False):
             prop.string_value = value
 
 
-
-def tag_new_elements_with_model_name(discipline_name, model_name):
-    for elem in bpy.data.objects:
+def add_custom_pset_values(elem, name_pset, key_values):
+    # one pset lookup per elem, values are added to the existing ones as ordered set
+    pset = elem.BIMObjectProperties.psets.get(name_pset)
+    if not pset:
+        pset = elem.BIMObjectProperties.psets.add()
+    pset.name = name_pset
+    props = {prop.name: prop for prop in pset.properties}
+    for key, values in key_values.items():
+        prop = props.get(key)
+        existing = []
+        if not prop:
+            prop = pset.properties.add()
+            prop.name = key
+        elif prop.string_value:
+            existing = prop.string_value.split(", ")
+        prop.string_value = ", ".join(dict.fromkeys([*existing, *values]))
+
+
+def tag_new_elements_with_model_name(discipline_name, model_name, elems=None):
+    # elems: the objects created by the import, all untagged objects by default
+    tagged = []
+    model_values = {
+        "origin_model": (model_name,),
+        "origin_discipline": (discipline_name,),
+    }
+    for elem in bpy.data.objects if elems is None else elems:
         if not elem.BIMObjectProperties.psets.get("Model"):
+            tagged.append(elem)
             # print(discipline_name, model_name)
-            add_custom_pset_key_value(
-                elem,
-                "Model",
-                "origin_model",
-                model_name,
-            )
-            add_custom_pset_key_value(
-                elem,
-                "Model",
-                "origin_discipline",
-                discipline_name,
-            )
+            add_custom_pset_values(elem, "Model", model_values)
+    return tagged
 
 
 def get_dict_key_from_value(search_dict, value):
@@ -149,6 +164,13 @@ def get_elems_by_param_values(value_part, only_key=None):
     return vals_obj
 
 
+def get_elem_guid(elem):
+    guid = elem.BIMObjectProperties.attributes.get("GlobalId")
+    if guid:
+        return guid.string_value
+    return ""
+
+
 def get_elem_storey(elem):
     users_collections = elem.users_collection
     obj_storey = [coll for coll in users_collections if "IfcBuildingStorey" in coll.name]
@@ -163,9 +185,9 @@ def get_elem_material_name(elem):
         if not mat.name:
             continue
         mat_name = mat.name
-        for search, result in MAT_MAP.items():
-            if search in mat_name:
-                return result
+        result = get_mat_map_name(mat_name)
+        if result:
+            return result
     return mat_name
 
 
@@ -178,23 +200,48 @@ def get_elem_materials(elem):
 
 
 def get_elem_ifc_material_name(elem):
-    mats = get_elem_ifc_materials(elem)
-    mats_set = set()
-    for mat in mats:
-        mats_set.add(mat.name)
+    # walls share a few layer sets: classified once per material name set
+    mats_set = frozenset(mat.name for mat in get_elem_ifc_materials(elem))
+    if mats_set in material_names:
+        material_cache_stats["hits"] += 1
+        return material_names[mats_set]
+    material_cache_stats["misses"] += 1
+    mat_name = classify_material_names(mats_set)
+    material_names[mats_set] = mat_name
+    return mat_name
+
+
+def classify_material_names(mats_set):
     unique_mat_count = len(mats_set)
+    if unique_mat_count == 0:
+        return ""
     if unique_mat_count == 1:
-        single_mat = mats_set.pop()
-        for search, result in MAT_MAP.items():
-            if search in single_mat:
-                return result
-    elif unique_mat_count > 1:
+        mat_name = get_mat_map_name(next(iter(mats_set)))
+    else:
         mat_name = get_mat_name_from_material_combinations(mats_set)
-        if mat_name:
-            return mat_name
-    elif unique_mat_count == 0:
-        return ""
-    return str(mats_set)
+    return mat_name or str(set(mats_set))
+
+
+def get_mat_map_name(mat_name):
+    # the first MAT_MAP search string contained in the name wins
+    groups = RE_MAT_MAP.match(mat_name).groups()
+    for result, group in zip(MAT_MAP_RESULTS, groups):
+        if group is not None:
+            return result
+
+
+def report_material_cache():
+    lookups = material_cache_stats["hits"] + material_cache_stats["misses"]
+    if not lookups:
+        return
+    print(f"material classification cache: {material_cache_stats['hits']} hits "
+          f"of {lookups} lookups ({material_cache_stats['hits'] / lookups:.1%}), "
+          f"{len(material_names)} material sets")
+
+
+def reset_material_cache():
+    material_names.clear()
+    material_cache_stats.clear()
 
 
 def get_elem_ifc_materials(elem):
@@ -216,20 +263,10 @@ def get_elem_ifc_materials(elem):
 
 
 def get_mat_name_from_material_combinations(mat_name_set):
-    for name, combinations_list in MAT_COMBO_MAP.items():
-        # print("-"*55)
-        # print(f"looking at combination: {combination}")
-        found = {k:None for k in mat_name_set}
-        for combination in combinations_list:
-            for word in combination:
-                for item in mat_name_set:
-                    # print(f"searching for {word} in {item}")
-                    if word in item:
-                        # print(f"found: {word}")
-                        found[item] = True
-                        if all(found.values()):
-                            # print(f"found all!! it is: {name}")
-                            return name
+    # every material has to contain one of the words of a combination group
+    for name, regex in RE_MAT_COMBOS.items():
+        if all(regex.search(item) for item in mat_name_set):
+            return name
 
 
 MAT_MAP = {
@@ -253,3 +290,20 @@ PIPE_MAT_MAP = {
     "Rohr DIN EN ISO 1127"   : "Edelstahl",
     "Stahlrohr nach DIN 2448": "Stahl",
 }
+
+# MAT_MAP as one regex: one optional lookahead group per search string in order,
+# the lowest matching group is the first search string contained in the name
+RE_MAT_MAP = re.compile(
+    "^" + "".join(f"(?:(?=.*?({re.escape(search)})))?" for search in MAT_MAP),
+    re.S,
+)
+MAT_MAP_RESULTS = tuple(MAT_MAP.values())
+RE_MAT_COMBOS = {
+    name: re.compile("|".join(sorted(
+        re.escape(word) for word in set().union(*combinations)
+    )))
+    for name, combinations in MAT_COMBO_MAP.items()
+}
+
+material_names = {}
+material_cache_stats = collections.Counter()
@@ -3,14 +3,23 @@ from blenderbim.bim import import_ifc
 import mathutils
 import logging
 import datetime
-import collision
-import bmesh
+import importlib
 import numpy as np
-import ifcclash
 import os
+import sys
+import collections
 from collections import namedtuple
+from pathlib import Path
 from subprocess import Popen
+from . import bboxes
 from . import colors
+from . import elements
+from . import footprints
+from . import meshes
+from .standalone import narrowphase
+from . import primitives
+from . import settings
+from . import storeys
 from . import utils
 
 # DONE identify voids
@@ -40,6 +49,7 @@ def link_blend_ifc(model_path, discipline_name):
     model_path = str(blend_model_path)
     with bpy.data.libraries.load(model_path, link=True) as (data_from, data_to):
         data_to.scenes = data_from.scenes
+    linked_objs = []
     for scene in bpy.data.scenes:
         if not scene.library or scene.library.filepath != model_path:
             continue
@@ -52,17 +62,22 @@ def link_blend_ifc(model_path, discipline_name):
                     if "IfcProject" in sub_child.name:
                         # print(f"but found in sub child: {child.children[0].name}")
                         bpy.data.scenes[0].collection.children[discipline_name].children.link(sub_child)
+                        linked_objs.extend(sub_child.all_objects)
                 continue
             bpy.data.scenes[0].collection.children[discipline_name].children.link(child)
-    return True
+            linked_objs.extend(child.all_objects)
+    return linked_objs
 
 
 def load_ifc(model_path, import_filter=None, selector=None):
+    """imports the model and returns the objects it created"""
+    existing = {obj.as_pointer() for obj in bpy.data.objects}
     if import_filter and selector:
         print(import_filter, selector)
         filtered_import_ifc(model_path, import_filter, selector)
     else:
         bpy.ops.import_ifc.bim(filepath=str(model_path))
+    return [obj for obj in bpy.data.objects if obj.as_pointer() not in existing]
 
 
 def filtered_import_ifc(ifc_file_path, import_filter, selector):
@@ -128,11 +143,10 @@ def bboxes_intersect(bbx_a, bbx_b):
 
 
 def get_bbox_from_object(element):
-    pts = [element.matrix_world @ mathutils.Vector(corner) for corner in element.bound_box]
-    ## pts = [element.matrix_world @ v.co for v in element.data.vertices]
-    # pts = [Pt(*tuple(corner)) for corner in element.bound_box]
-    min_pt   = mathutils.Vector(min([tuple(pt) for pt in pts]))
-    max_pt   = mathutils.Vector(max([tuple(pt) for pt in pts]))
+    corners = bboxes.get_world_corners([element])[0]
+    pts = [mathutils.Vector(pt) for pt in corners]
+    min_pt = mathutils.Vector(corners.min(axis=0))
+    max_pt = mathutils.Vector(corners.max(axis=0))
     centroid = mathutils.Vector((
         (max_pt.x - min_pt.x) / 2 + min_pt.x,
         (max_pt.y - min_pt.y) / 2 + min_pt.y,
@@ -141,37 +155,74 @@ def get_bbox_from_object(element):
     return Bbox(pts, min_pt, max_pt, centroid)
 
 
-def is_elem_not_intersecting_any_void(elem, voids):
-    elem_bbx = get_bbox_from_object(elem)
-    for void in voids:
-        # print(void, elem)
-        if void == elem:
-            continue
-        void_bbx = void_bboxes[void.name]
-        if void_bbx == elem_bbx:
-            print(f"DUPLICATE!!: {void} - {elem}")
+def get_void_bounds(voids):
+    rows = [void_bboxes.rows[row] for row in elements.get_rows(elem_index, voids)]
+    return void_bboxes.array[rows].reshape(-1, 2, 3)
+
+
+def get_void_overlap_flags(elems, voids=None):
+    # culls against the collision bounds (incl. proxy offset) and oriented boxes,
+    # so no element the collision check would reach is deleted
+    elems = list(elems)
+    all_voids = voids
+    if void_collision is None and voids is None:
+        all_voids = utils.get_elems_by_name(PROV_VOID_ID)
+    void_coll = get_void_collision(all_voids)
+    pairs = get_broad_phase_pairs(void_coll, elems, "culling")
+    void_ids = np.array(elements.get_rows(elem_index, void_coll.voids), dtype=np.int64)
+    elem_ids = np.array(elements.get_rows(elem_index, elems), dtype=np.int64)
+    pairs = pairs[void_ids[pairs[:, 0]] != elem_ids[pairs[:, 1]]]
+    if voids is not None:
+        pairs = pairs[np.isin(void_ids[pairs[:, 0]], elements.get_rows(elem_index, voids))]
+    flags = np.zeros(len(elems), dtype=bool)
+    flags[pairs[:, 1]] = True
+    return flags
+
+
+def filter_obb_pairs(pairs, boxes_a, boxes_b, stage):
+    # (row a, row b) aabb candidate pairs whose oriented boxes overlap as well
+    centers_a, axes_a, halves_a = boxes_a
+    centers_b, axes_b, halves_b = boxes_b
+    rows_a, rows_b = pairs[:, 0], pairs[:, 1]
+    hits = bboxes.obb_overlap_rowwise(
+        centers_a[rows_a], axes_a[rows_a], halves_a[rows_a],
+        centers_b[rows_b], axes_b[rows_b], halves_b[rows_b],
+    )
+    eliminated = len(pairs) - int(hits.sum())
+    obb_pair_counts[stage] += len(pairs)
+    obb_pair_counts[f"{stage}_eliminated"] += eliminated
+    print(f"obb broad phase {stage}: eliminated {eliminated} of {len(pairs)} aabb pairs")
+    return pairs[hits]
+
+
+def report_obb_pair_counts():
+    for stage in ("void-void", "culling", "collision"):
+        pair_count = obb_pair_counts[stage]
+        if not pair_count:
             continue
-        intersects = bboxes_overlap(void_bbx, elem_bbx)
-        if intersects:
-            # print(f"should not delete elem: {elem}")
-            # print(f"CX: {void} - {elem}")
-            return False
-    return True
+        eliminated = obb_pair_counts[f"{stage}_eliminated"]
+        print(f"obb broad phase {stage:10}: eliminated {eliminated} of {pair_count} aabb pairs "
+              f"({eliminated / pair_count:.1%})")
+
+
+def is_elem_not_intersecting_any_void(elem, voids):
+    return not get_void_overlap_flags([elem], voids)[0]
 
 
 def remove_duplicate_voids(pairs):
-    looked_at   = set()
-    delete_objs = set()
-    for k, v in pairs.items():
-        if v not in looked_at:
-            delete_objs.add(k)
-        looked_at.add(k)
+    delete_objs = set(pairs)
+    if delete_objs:
+        invalidate_void_collision()
+    removed_guids = sorted(elements.get_guid(elem_index, obj) for obj in delete_objs)
     delete_objects(delete_objs)
+    if removed_guids:
+        print(f"removed duplicate voids: {', '.join(removed_guids)}")
+    return removed_guids
 
 
 def create_tri_proxy(elem, target_collection):
     elem_bbox = get_bbox_from_object(elem)
-    offset = 0.03
+    offset = settings.VOID_PROXY_OFFSET
     new_mesh = bpy.data.meshes.new("tri_void_proxy")
     vertices = [
         mathutils.Vector((
@@ -224,73 +275,262 @@ def generate_void_proxies(voids):
         create_tri_proxy(void, proxy_coll)
 
 
-def create_void_tri_proxy_map(void_tri_proxies):
-    proxy_tri_void_map = {}
-    for proxy in void_tri_proxies:
-        suffix = ""
-        # print(proxy)
-        if len(proxy.name.split(".")) > 1:
-            suffix = f".{proxy.name.split('.')[-1]}"
-        void_name = f"{PROV_VOID_ID}{suffix}"
-        proxy_tri_void_map[proxy.name] = bpy.context.scene.objects.get(void_name)
-    return proxy_tri_void_map
-
-
-def add_to_cm(cm, object_names):
-    for object_name in object_names:
-        name = object_name.name
-        obj = bpy.data.objects[name]
-        # print(f"meshing for collision check: {object_name}")
-        triangulated_mesh = triangulate_mesh(obj)
-        mat = np.array(obj.matrix_world)
-        mesh = ifcclash.Mesh()
-        mesh.vertices = np.array([tuple(v.co) for v in triangulated_mesh.vertices])
-        mesh.faces = np.array([tuple(p.vertices) for p in triangulated_mesh.polygons])
-        cm.add_object(name, mesh, mat)
-
-
-def get_collision_results(set_a=None, set_b=None):
-    a_cm = collision.CollisionManager()
-    b_cm = collision.CollisionManager()
-    # no tri meshing needed for void_tri_proxies?
-    add_to_cm(a_cm, set_a)
-    add_to_cm(b_cm, set_b)
-    return a_cm.in_collision_other(b_cm, return_data=True)
-
-
-def triangulate_mesh(obj):
-    mesh = obj.evaluated_get(bpy.context.evaluated_depsgraph_get()).to_mesh()
-    bm = bmesh.new()
-    bm.from_mesh(mesh)
-    bmesh.ops.triangulate(bm, faces=bm.faces)
-    bm.to_mesh(mesh)
-    bm.free()
-    del bm
-    return mesh
-
-
-def get_void_void_bbox_intersection_and_duplicates(voids):
+def get_packed_elem_meshes(elems, rows, mesh_cache=None):
+    # world space triangles of the given rows, all other elems stay empty
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    elem_meshes = [EMPTY_MESH] * len(elems)
+    for row in rows:
+        elem_meshes[row] = meshes.get_world_mesh_arrays(elems[row], depsgraph, mesh_cache)
+    return narrowphase.pack_meshes(elem_meshes)
+
+
+def get_void_geometries(voids):
+    # world space triangles per void: analytic shape, mesh fallback or tri proxy
+    if settings.VOID_GEOMETRY != "analytic":
+        vertices, faces = meshes.get_tri_proxy_arrays(
+            bboxes.get_bounds(voids),
+            settings.VOID_PROXY_OFFSET,
+        )
+        return [(proxy_vertices, faces) for proxy_vertices in vertices], [None] * len(voids)
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    geometries, void_primitives = [], []
+    for void in voids:
+        primitive = primitives.get_void_primitive(
+            void,
+            settings.VOID_DIMENSION_SCALE,
+            settings.VOID_DIMENSION_TOLERANCE,
+            settings.VOID_PROXY_OFFSET,
+        )
+        if primitive:
+            geometries.append(primitives.get_primitive_triangles(
+                primitive,
+                settings.VOID_CYLINDER_SEGMENTS,
+            ))
+        else:
+            geometries.append(meshes.get_world_mesh_arrays(void, depsgraph))
+        void_primitives.append(primitive)
+    fallbacks = void_primitives.count(None)
+    print(f"analytic void geometry: {len(voids) - fallbacks} voids, mesh fallback: {fallbacks}")
+    return geometries, void_primitives
+
+
+def build_void_collision(voids):
+    # void geometry only exists as arrays, rows follow the given voids
+    global void_collision
+    voids = list(voids)
+    guids = [elements.get_guid(elem_index, void) for void in voids]
+    geometries, void_primitives = get_void_geometries(voids)
+    bounds = np.array([(v.min(axis=0), v.max(axis=0)) for v, _ in geometries]).reshape(-1, 2, 3)
+    if settings.VOID_GEOMETRY == "analytic":
+        # mesh fallback voids keep their mesh, only their boxes and bounds grow
+        offset = settings.VOID_PROXY_OFFSET
+        centers, axes, halves = bboxes.get_obbs(voids)
+        fallback_boxes = centers, axes, halves + primitives.get_growth("box", axes, offset)
+        fallbacks = np.array([primitive is None for primitive in void_primitives], dtype=bool)
+        bounds[fallbacks] += np.array([[-offset, -offset, 0.0], [offset, offset, 0.0]])
+    else:
+        fallback_boxes = bboxes.get_aabb_boxes(bounds)
+    void_collision = VoidCollision(
+        {}, voids, guids, geometries,
+        primitives.get_boxes(void_primitives, fallback_boxes), bounds,
+        bboxes.build_grid(bounds, settings.VOID_GRID_CELL_SIZE),
+    )
+    print(f"built void collision geometry of {len(voids)} voids")
+    return void_collision
+
+
+def invalidate_void_collision():
+    global void_collision
+    void_collision = None
+
+
+def get_void_collision(voids):
+    # built once and reused by every discipline pass until invalidated
+    if void_collision is None:
+        return build_void_collision(voids)
+    return void_collision
+
+
+def get_backend(void_coll, name):
+    # backends are built on first use and kept with the void geometry
+    if name not in void_coll.backends:
+        void_coll.backends[name] = narrowphase.get_backend(
+            name,
+            void_coll.geometries,
+            void_coll.boxes,
+        )
+    return void_coll.backends[name]
+
+
+def get_standalone_narrowphase():
+    # spawned workers can't import this package (bpy), only the module itself.
+    # its directory holds nothing else, so no other add-on module becomes top level
+    standalone_dir = str(Path(narrowphase.__file__).parent)
+    if standalone_dir not in sys.path:
+        sys.path.append(standalone_dir)
+    return importlib.import_module("narrowphase")
+
+
+def get_backend_hits(void_coll, name, packed, pairs):
+    workers = settings.NARROW_PHASE_WORKERS or os.cpu_count()
+    chunk_size = settings.NARROW_PHASE_CHUNK_SIZE
+    if workers < 2 or len(pairs) <= chunk_size:
+        return get_backend(void_coll, name).get_hits(packed, pairs)
+    if not narrowphase.has_shared_memory():
+        print(f"narrow phase {name}: no multiprocessing.shared_memory "
+              f"(python {sys.version_info[0]}.{sys.version_info[1]}), running in process")
+        return get_backend(void_coll, name).get_hits(packed, pairs)
+    print(f"narrow phase {name}: {len(pairs)} pairs on {workers} workers")
+    return get_standalone_narrowphase().get_hits_parallel(
+        name,
+        void_coll.geometries,
+        void_coll.boxes,
+        packed,
+        pairs,
+        workers,
+        chunk_size,
+        settings.NARROW_PHASE_PYTHON,
+    )
+
+
+@utils.timing
+def get_hull_tier(void_coll, elems, packed, pairs):
+    # pairs separated from the element hull are dropped, voids fully inside
+    # the hull of a nearly convex element are accepted without triangle test
+    separated = np.zeros(len(pairs), dtype=bool)
+    accepted  = np.zeros(len(pairs), dtype=bool)
+    centers, axes, halves = void_coll.boxes
+    order = np.argsort(pairs[:, 1], kind="stable")
+    elem_rows, starts = np.unique(pairs[order, 1], return_index=True)
+    elem_ids = elements.get_rows(elem_index, [elems[row] for row in elem_rows])
+    for elem_row, elem_id, rows in zip(elem_rows, elem_ids, np.split(order, starts[1:])):
+        if elem_id not in elem_hulls:
+            elem_hulls[elem_id] = meshes.get_convex_hull(
+                *narrowphase.get_packed_mesh(packed, elem_row),
+                settings.HULL_MIN_CONVEXITY,
+            )
+        hull = elem_hulls[elem_id]
+        if not hull:
+            continue
+        void_rows = pairs[rows, 0]
+        separated[rows], inside = narrowphase.boxes_vs_hull(
+            centers[void_rows],
+            axes[void_rows],
+            halves[void_rows],
+            hull.vertices,
+            hull.normals,
+            hull.offsets,
+        )
+        accepted[rows] = inside & hull.convex
+    return pairs[accepted], pairs[~separated & ~accepted], int(separated.sum())
+
+
+@utils.timing
+def get_narrow_phase_hits(void_coll, elems, packed, pairs):
+    name, other_name = settings.COLLISION_BACKEND, settings.COLLISION_DIFFERENTIAL
+    hits = get_backend_hits(void_coll, name, packed, pairs)
+    if other_name:
+        mismatches, mismatch_hits = narrowphase.get_mismatches(
+            pairs,
+            hits,
+            get_backend_hits(void_coll, other_name, packed, pairs),
+        )
+        print(f"differential {name} vs {other_name}: "
+              f"{len(mismatches)} of {len(pairs)} pairs mismatch")
+        for (void_row, elem_row), hit in zip(mismatches, mismatch_hits):
+            print(f"  {void_coll.guids[void_row]} - {elems[elem_row].name}: "
+                  f"{name} {bool(hit)}, {other_name} {not hit}")
+    return hits
+
+
+def get_broad_phase_pairs(void_coll, set_b, stage="collision"):
+    bounds_b = bboxes.get_bounds(set_b)
+    pairs = bboxes.query_grid_pairs(void_coll.grid, bounds_b, inclusive=True)[:, ::-1]
+    if settings.OBB_BROAD_PHASE:
+        pairs = filter_obb_pairs(pairs, void_coll.boxes, bboxes.get_obbs(set_b), stage)
+    return pairs
+
+
+def get_segment_hits(void_coll, elems, pairs):
+    # straight segments are tested analytically instead of meshed
+    segments = {}
+    for row in np.unique(pairs[:, 1]):
+        elem = elems[row]
+        if elem_index.classes[elements.get_row(elem_index, elem)] != "IfcFlowSegment":
+            continue
+        segment = primitives.get_segment_primitive(
+            elem,
+            meshes.get_vertex_array(elem),
+            settings.SEGMENT_TOLERANCE,
+        )
+        if segment:
+            segments[row] = segment
+    is_segment = np.isin(pairs[:, 1], list(segments))
+    segment_pairs = pairs[is_segment]
+    hits = np.zeros(len(segment_pairs), dtype=bool)
+    if len(segment_pairs):
+        box_centers, box_axes, box_halves = void_coll.boxes
+        void_rows = segment_pairs[:, 0]
+        hits = primitives.segments_hit_boxes(
+            [segments[row] for row in segment_pairs[:, 1]],
+            box_centers[void_rows],
+            box_axes[void_rows],
+            box_halves[void_rows],
+        )
+    print(f"segment fast path: {len(segments)} segments, "
+          f"{len(segment_pairs)} pairs, {hits.sum()} hits")
+    return segment_pairs[hits], pairs[~is_segment]
+
+
+def get_collision_results(set_a=None, set_b=None, mesh_cache=None):
+    """colliding (void row, set_b row) pairs"""
+    void_coll = get_void_collision(set_a)
+    set_b = list(set_b)
+    pairs = get_broad_phase_pairs(void_coll, set_b)
+    segment_hits = np.empty((0, 2), dtype=np.int64)
+    if settings.SEGMENT_FAST_PATH:
+        segment_hits, pairs = get_segment_hits(void_coll, set_b, pairs)
+    candidate_rows = np.unique(pairs[:, 1])
+    print(f"broad phase: {len(pairs)} candidate pairs, "
+          f"skipped {len(set_b) - len(candidate_rows)} of {len(set_b)} elements")
+    if not len(candidate_rows):
+        return segment_hits
+    packed = get_packed_elem_meshes(set_b, candidate_rows, mesh_cache)
+    hull_hits, hull_rejected = np.empty((0, 2), dtype=np.int64), 0
+    if settings.HULL_CASCADE:
+        hull_hits, pairs, hull_rejected = get_hull_tier(void_coll, set_b, packed, pairs)
+    hits = get_narrow_phase_hits(void_coll, set_b, packed, pairs)
+    print(f"collision tiers: segment {len(segment_hits)} hits, "
+          f"hull rejected {hull_rejected} accepted {len(hull_hits)}, "
+          f"mesh {len(pairs)} pairs {hits.sum()} hits")
+    results = np.concatenate((pairs[hits], hull_hits, segment_hits))
+    return results[np.lexsort((results[:, 1], results[:, 0]))]
+
+
+def get_void_void_bbox_intersection_and_duplicates(voids, brute_force=False, tolerance=0.0):
     intersections = set()
     duplicates    = set()
-    duplicate_pairs = {}
-    void_bboxes = get_void_bboxes(voids)
-    for void_a in voids:
-        void_a_bbx = void_bboxes[void_a.name]
-        for void_b in voids:
-            void_b_bbx = void_bboxes[void_b.name]
-            if void_a == void_b:  # skip self
-                continue
-            if void_a_bbx == void_b_bbx:
-                print(f"DUPLICATE!!: {void_a} - {void_b}")
-                duplicates.add(void_a)
-                duplicates.add(void_b)
-                duplicate_pairs[void_a] = void_b
-                continue
-            intersects = bboxes_overlap(void_a_bbx, void_b_bbx)
-            if intersects:
-                print(f"VOID-VOID-INTERSECTION!!: {void_a} - {void_b}")
-                intersections.add(void_a)
-                intersections.add(void_b)
+    bounds = get_void_bboxes(voids).array
+    labels = bboxes.get_duplicate_labels(bounds, tolerance)
+    duplicate_pairs = get_duplicate_void_pairs(voids, labels)
+    for duplicate, survivor in duplicate_pairs.items():
+        print(f"DUPLICATE!!: {duplicate} - {survivor}")
+        duplicates.add(duplicate)
+        duplicates.add(survivor)
+    if brute_force:
+        pairs = get_void_void_pairs_brute_force(bounds)
+    else:
+        pairs = bboxes.sweep_and_prune_pairs(bounds)
+    if settings.OBB_BROAD_PHASE:
+        obbs = bboxes.get_obbs(voids)
+        pairs = filter_obb_pairs(pairs, obbs, obbs, "void-void")
+    labels_a, labels_b = labels[pairs[:, 0]], labels[pairs[:, 1]]
+    same_duplicate = (labels_a == labels_b) & (labels_a >= 0)
+    for i, j in pairs[~same_duplicate]:
+        void_a, void_b = voids[i], voids[j]
+        print(f"VOID-VOID-INTERSECTION!!: {void_a} - {void_b}")
+        intersections.add(void_a)
+        intersections.add(void_b)
     if intersections:
         print(f"WARNING: found {len(intersections)} void-void bbox intersections!")
     if duplicates:
@@ -298,207 +538,238 @@ def get_void_void_bbox_intersection_and_duplicates(voids):
     return intersections, duplicates, duplicate_pairs
 
 
+def get_duplicate_void_pairs(voids, labels):
+    # the void with the lowest GlobalId of each group survives
+    groups = {}
+    for row in np.flatnonzero(labels >= 0):
+        groups.setdefault(labels[row], []).append(voids[row])
+    duplicate_pairs = {}
+    for group in groups.values():
+        group = sorted(group, key=lambda void: elements.get_guid(elem_index, void))
+        survivor = group[0]
+        for duplicate in group[1:]:
+            duplicate_pairs[duplicate] = survivor
+    return duplicate_pairs
+
+
+def get_void_void_pairs_brute_force(bounds):
+    pairs = []
+    for i in range(len(bounds)):
+        overlaps = bboxes.overlap_one_many(bounds[i], bounds)
+        overlaps[:i + 1] = False  # skip self and seen pairs
+        pairs.extend((i, j) for j in np.flatnonzero(overlaps))
+    return np.array(pairs, dtype=np.int64).reshape(-1, 2)
+
+
 def get_void_bbox_overlap_objs(void, elems):
-    overlapping = set()
-    void_bbx = void_bboxes[void.name]
-    for elem in elems:
-        elem_bbx = get_bbox_from_object(elem)
-        if bboxes_overlap(void_bbx, elem_bbx):
-            overlapping.add(elem)
-    return overlapping
+    elems = list(elems)
+    overlaps = bboxes.overlap_one_many(get_void_bounds([void])[0], bboxes.get_bounds(elems))
+    return {elem for elem, overlap in zip(elems, overlaps) if overlap}
 
 
 def get_void_intersection_elem_data(void, discipline: str, elems,
                                     pset_keys=None, attrib_keys=None,
                                     map_materials=False, value_replace_map=None):
-    void_bbx = void_bboxes[void.name]
+    elems = list(elems)
+    void_bbx = get_void_bounds([void])[0]
+    plan = compile_mapping_plan(
+        pset_keys=pset_keys,
+        attrib_keys=attrib_keys,
+        map_materials=map_materials,
+        value_replace_map=value_replace_map,
+    )
+    elems_overlap = bboxes.overlap_one_many(void_bbx, bboxes.get_bounds(elems))
+    for elem, overlaps in zip(elems, elems_overlap):
+        if overlaps:
+            map_void_elem_data(void, elem, plan)
+
+
+def compile_mapping_plan(pset_keys=None, attrib_keys=None,
+        map_ifc_classes=False, map_materials=False, value_replace_map=None):
+    """flat (source, pset, source key, target key, value map) steps of a mapping pass"""
     map_key_sep = ":->:"  # f"LongName:->:{discipline_name}_RoomLongNames"
-    pset_keys   = pset_keys   if pset_keys   else ()
-    attrib_keys = attrib_keys if attrib_keys else ()
-    for elem in elems:
-        elem_bbx = get_bbox_from_object(elem)
-        overlaps = bboxes_overlap(void_bbx, elem_bbx)
-        # print(void, elem)
-        if not overlaps:
-            continue
-        # print("got overlap")
-        for pset_name in pset_keys:
-            elem_pset = elem.BIMObjectProperties.psets.get(pset_name)
-            if not elem_pset:
+    plan = []
+    if map_ifc_classes:
+        plan.append(MappingStep("ifc_class", None, None, "intersects_ifc_class", None))
+    for pset_name, keys in (pset_keys or {}).items():
+        for key in keys:
+            target_key = key.replace('origin_', 'intersects_')
+            if 'intersects_' not in target_key:
+                target_key = f"intersects_{target_key}"
+            if map_key_sep in key:
+                key, target_key = key.split(map_key_sep)
+                target_key = f"intersects_{target_key}"
+            plan.append(MappingStep("pset", pset_name, key, target_key, value_replace_map))
+    for keys in (attrib_keys or {}).values():
+        for key in keys:
+            target_key = f"intersects_{key}"
+            if map_key_sep in key:
+                key, target_key = key.split(map_key_sep)
+                target_key = f"intersects_{target_key}"
+            plan.append(MappingStep("attribute", None, key, target_key, None))
+    if map_materials:
+        plan.append(MappingStep("material", None, None, "intersects_WallMaterial", None))
+    return tuple(plan)
+
+
+def get_elem_values(elem, plan, ifc_class):
+    """(target key, value) pairs the plan extracts from an elem"""
+    props = elem.BIMObjectProperties
+    psets = {}
+    values = []
+    for step in plan:
+        if step.source == "ifc_class":
+            if not ifc_class:
+                print(f"no / split found in elem name: {elem.name}")
                 continue
-            # print(f"found elem Model pset of {elem} for {void}")
-            for key in pset_keys[pset_name]:
-                target_key = key.replace('origin_', 'intersects_')
-                if 'intersects_' not in target_key:
-                    target_key = f"intersects_{target_key}"
-                if map_key_sep in key:
-                    target_key = f"intersects_{key.split(map_key_sep)[1]}"
-                    key = key.split(map_key_sep)[0]
-                # print(f"looking for {key} in {pset_name} to put value in: {target_key}")
-                cx_key_val = elem_pset.properties.get(key)
-                if not cx_key_val:
-                    continue
-                cx_key_val = cx_key_val.string_value
-                if value_replace_map:
-                    if value_replace_map.get(cx_key_val):
-                        cx_key_val = value_replace_map[cx_key_val]
-                # print(f"found {cx_key_val}\n")
-                utils.add_custom_pset_key_value(
-                    void,
-                    "Pset_ProvisionForVoid",
-                    target_key,
-                    cx_key_val,
-                    concat=True,
-                )
-        for attrib_name in attrib_keys:
-            elem_attribs = elem.BIMObjectProperties.attributes
-            if not elem_attribs:
+            value = ifc_class
+        elif step.source == "material":
+            value = utils.get_elem_ifc_material_name(elem)
+        else:
+            if step.source == "pset":
+                if step.pset not in psets:
+                    pset = props.psets.get(step.pset)
+                    psets[step.pset] = pset.properties if pset else None
+                items = psets[step.pset]
+            else:
+                items = props.attributes
+            prop = items.get(step.key) if items else None
+            if not prop:
                 continue
-            for key in attrib_keys[attrib_name]:
-                target_key = f"intersects_{key}"
-                if map_key_sep in key:
-                    target_key = f"intersects_{key.split(map_key_sep)[1]}"
-                    key = key.split(map_key_sep)[0]
-                cx_key_val = elem_attribs.get(key)
-                if not cx_key_val:
-                    continue
-                cx_key_val = cx_key_val.string_value
-                utils.add_custom_pset_key_value(
-                    void,
-                    "Pset_ProvisionForVoid",
-                    target_key,
-                    cx_key_val,
-                    concat=True,
-                )
-        if map_materials:
-            mat_name = utils.get_elem_ifc_material_name(elem)
-            if mat_name:
-                utils.add_custom_pset_key_value(
-                    void,
-                    "Pset_ProvisionForVoid",
-                    "intersects_WallMaterial",
-                    mat_name,
-                    concat=True,
-                )
+            value = prop.string_value
+        if step.value_map and step.value_map.get(value):
+            value = step.value_map[value]
+        if value:
+            values.append((step.target, value))
+    return values
 
 
 @utils.timing
 def map_void_data_by_collision(set_a=None, set_b=None,
-        pset_keys=None, attrib_keys=None, void_proxies=True,
-        map_ifc_classes=False, map_materials=False, value_replace_map=None):
+        pset_keys=None, attrib_keys=None,
+        map_ifc_classes=False, map_materials=False, value_replace_map=None,
+        mesh_cache=None):
     if not all((set_a, set_b)):
         return
-    err, results = get_collision_results(set_a=set_a, set_b=set_b)
-    seen_pairs = set()
-    map_key_sep = ":->:"  # f"LongName:->:{discipline_name}_RoomLongNames"
-    for result in results:
-        void_id = "tri_void_proxy." if void_proxies else PROV_VOID_ID
-        result_pair = result.names
-        result_names_str = str(result_pair)
-        if result_names_str in seen_pairs:
-            continue
-        # print(35 * "-")
-        # print(result_names_str)
-        seen_pairs.add(str(result_pair))
-        void  = [bpy.context.scene.objects.get(e) for e in result_pair if void_id in e]
-        other = [bpy.context.scene.objects.get(e) for e in result_pair if void_id not in e]
+    set_b = list(set_b)
+    results = get_collision_results(set_a=set_a, set_b=set_b, mesh_cache=mesh_cache)
+    void_coll = get_void_collision(set_a)
+    plan = compile_mapping_plan(
+        pset_keys=pset_keys,
+        attrib_keys=attrib_keys,
+        map_ifc_classes=map_ifc_classes,
+        map_materials=map_materials,
+        value_replace_map=value_replace_map,
+    )
+    elem_values = {}
+    for void_row, elem_row in results:
+        void, other = void_coll.voids[void_row], set_b[elem_row]
         print(void, other)
-        if not all((void, other)):
-            print(f"no regular void/other pair: {result_pair}")
-            continue
-        void = next(iter(void))
-        void = tri_proxy_void_map[void.name] if void_proxies else void
-        other = next(iter(other))
-        if not all((void, other)):
-            print(f"no regular void/other pair: {result_pair}")
+        map_void_elem_data(void, other, plan, elem_values)
+
+
+def get_prism_index(elems, mesh_cache=None):
+    # elems that are no vertical extrusion are returned for the mesh route
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    prism_elems, prisms, other = [], [], []
+    for elem in elems:
+        prism = footprints.get_prism(
+            *meshes.get_world_mesh_arrays(elem, depsgraph, mesh_cache),
+            settings.FOOTPRINT_TOLERANCE,
+        )
+        if prism:
+            prism_elems.append(elem)
+            prisms.append(prism)
+        else:
+            other.append(elem)
+    return footprints.build_prism_index(prism_elems, prisms), other
+
+
+@utils.timing
+def map_void_data_by_footprint(set_a=None, set_b=None, offset=0.0, oriented=False,
+        pset_keys=None, attrib_keys=None,
+        map_ifc_classes=False, map_materials=False, value_replace_map=None,
+        mesh_cache=None):
+    if not all((set_a, set_b)):
+        return
+    void_coll = get_void_collision(set_a)
+    index, other = get_prism_index(set_b, mesh_cache)
+    boxes = None
+    if oriented:
+        centers, axes, halves = void_coll.boxes
+        boxes = centers, axes, halves + offset
+    pairs = footprints.get_box_prism_pairs(
+        index,
+        bboxes.expand(void_coll.bounds, offset),
+        boxes,
+    )
+    print(f"footprint lookup: {len(index.objs)} prisms, {len(pairs)} void pairs, "
+          f"mesh fallback: {len(other)} elements")
+    plan = compile_mapping_plan(
+        pset_keys=pset_keys,
+        attrib_keys=attrib_keys,
+        map_ifc_classes=map_ifc_classes,
+        map_materials=map_materials,
+        value_replace_map=value_replace_map,
+    )
+    elem_values = {}
+    for void_row, prism_row in pairs:
+        map_void_elem_data(void_coll.voids[void_row], index.objs[prism_row], plan, elem_values)
+    map_void_data_by_collision(
+        set_a=set_a,
+        set_b=other,
+        pset_keys=pset_keys,
+        attrib_keys=attrib_keys,
+        map_ifc_classes=map_ifc_classes,
+        map_materials=map_materials,
+        value_replace_map=value_replace_map,
+        mesh_cache=mesh_cache,
+    )
+
+
+def map_void_elem_data(void, other, plan, elem_values=None):
+    # elem values are extracted once per pass and reused for every void they hit
+    if elem_values is None:
+        elem_values = {}
+    row = elements.get_row(elem_index, other)
+    if row not in elem_values:
+        elem_values[row] = get_elem_values(other, plan, elem_index.classes[row])
+    for target_key, value in elem_values[row]:
+        add_void_value(void, target_key, value)
+
+
+def add_void_value(void, key, value):
+    # collected per void GlobalId and written once by flush_void_data
+    if not value:
+        return
+    guid = elements.get_guid(elem_index, void)
+    void_values.setdefault(guid, {}).setdefault(key, {})[value] = None
+
+
+@utils.timing
+def flush_void_data(voids):
+    flushed = 0
+    for void in voids:
+        key_values = void_values.get(elements.get_guid(elem_index, void))
+        if not key_values:
             continue
-        if map_ifc_classes:
-            if not getattr(other, "name"):
-                print(f"elem name none: {other.name}")
-            elif "/" not in  other.name:
-                print(f"no / split found in elem name: {other.name}")
-            else:
-                other_ifc_class = other.name.split("/")[0]
-                utils.add_custom_pset_key_value(
-                    void,
-                    "Pset_ProvisionForVoid",
-                    "intersects_ifc_class",
-                    other_ifc_class,
-                    concat=True,
-                )
-        if pset_keys:
-            for pset_name in pset_keys:
-                elem_pset = other.BIMObjectProperties.psets.get(pset_name)
-                if not elem_pset:
-                    continue
-                # print(f"found elem Model pset of {elem} for {void}")
-                for key in pset_keys[pset_name]:
-                    target_key = key.replace('origin_', 'intersects_')
-                    if 'intersects_' not in target_key:
-                        target_key = f"intersects_{target_key}"
-                    # print(f"looking for {key} in {pset_name} to put value in: {target_key}")
-                    if map_key_sep in key:
-                        target_key = f"intersects_{key.split(map_key_sep)[1]}"
-                        key = key.split(map_key_sep)[0]
-                    cx_key_val = elem_pset.properties.get(key)
-                    if not cx_key_val:
-                        continue
-                    cx_key_val = cx_key_val.string_value
-                    if value_replace_map:
-                        if value_replace_map.get(cx_key_val):
-                            cx_key_val = value_replace_map[cx_key_val]
-                    # print(f"found {cx_key_val}\n")
-                    utils.add_custom_pset_key_value(
-                        void,
-                        "Pset_ProvisionForVoid",
-                        target_key,
-                        cx_key_val,
-                        concat=True,
-                    )
-                    # print(void, cx_key_val)
-        if attrib_keys:
-            for attrib_name in attrib_keys:
-                elem_attribs = other.BIMObjectProperties.attributes
-                if not elem_attribs:
-                    continue
-                for key in attrib_keys[attrib_name]:
-                    target_key = f"intersects_{key}"
-                    if map_key_sep in key:
-                        target_key = f"intersects_{key.split(map_key_sep)[1]}"
-                        key = key.split(map_key_sep)[0]
-                    cx_key_val = elem_attribs.get(key)
-                    if not cx_key_val:
-                        continue
-                    cx_key_val = cx_key_val.string_value
-                    utils.add_custom_pset_key_value(
-                        void,
-                        "Pset_ProvisionForVoid",
-                        target_key,
-                        cx_key_val,
-                        concat=True,
-                    )
-        if map_materials:
-            mat_name = utils.get_elem_ifc_material_name(other)
-            if mat_name:
-                utils.add_custom_pset_key_value(
-                    void,
-                    "Pset_ProvisionForVoid",
-                    "intersects_WallMaterial",
-                    mat_name,
-                    concat=True,
-                )
+        utils.add_custom_pset_values(void, "Pset_ProvisionForVoid", key_values)
+        flushed += 1
+    void_values.clear()
+    print(f"flushed mapped data of {flushed} voids")
 
 
 @utils.timing
 def delete_objects(delete_objs):
+    elements.remove_elems(elem_index, delete_objs)
     bpy.ops.object.select_all(action='DESELECT')
     bpy.ops.object.delete({"selected_objects": delete_objs})
     print(f"deleted {len(delete_objs)} objects")
 
 
-def sort_voids_other(elements):
+def sort_voids_other(elems):
     voids, other = [], []
-    for elem in elements:
+    for elem in elems:
         if "ProvisionForVoid" in elem.name:
             voids.append(elem)
         else:
@@ -508,37 +779,31 @@ def sort_voids_other(elements):
     return voids, other
 
 
-def find_non_void_intersecting_elems(elements, voids):
-    objs_to_delete = []
-    # intersecting = {False: 0, True: 0}
-    for elem in elements:
-        not_intersecting = is_elem_not_intersecting_any_void(elem, voids)
-        if not not_intersecting:
-            # print(f"keep: {elem}")
-            # intersecting[True] += 1
-            continue
-        else:
-            objs_to_delete.append(elem)
-            # intersecting[False] += 1
-    # print(f"ratio of intersecting elements: {intersecting}")
+def find_non_void_intersecting_elems(elems, voids=None):
+    flags = get_void_overlap_flags(elems, voids)
+    objs_to_delete = [elem for elem, intersecting in zip(elems, flags) if not intersecting]
+    # print(f"ratio of intersecting elements: {flags.mean()}")
     return objs_to_delete
 
 
-def find_void_intersecting_elems(elements, voids):
-    intersecting = []
-    for elem in elements:
-        not_intersecting = is_elem_not_intersecting_any_void(elem, voids)
-        if not not_intersecting:
-            intersecting.append(elem)
-    return intersecting
+def find_void_intersecting_elems(elems, voids=None):
+    flags = get_void_overlap_flags(elems, voids)
+    return [elem for elem, intersecting in zip(elems, flags) if intersecting]
 
 
 @utils.timing
 def get_void_bboxes(voids):
-    void_bbox_map = {}
-    for void in voids:
-        void_bbox_map[void.name] = get_bbox_from_object(void)
-    return void_bbox_map
+    return bboxes.get_bounds_table(voids, elements.get_rows(elem_index, voids))
+
+
+@utils.timing
+def index_voids(voids):
+    # raw void bboxes of the per void helpers get_void_bbox_overlap_objs and
+    # get_void_intersection_elem_data, culling and collision use void_collision
+    global void_bboxes
+    void_bboxes = get_void_bboxes(voids)
+    print(f"indexed {len(voids)} voids")
+    return void_bboxes
 
 
 def write_void_data_to_csv(csv_path):
@@ -582,7 +847,7 @@ def write_void_data_to_csv(csv_path):
             void_data["ifc_guid"] = ifc_guid
             void_data["ifc_desc"] = ifc_desc
             void_data["name"] = void.name
-            void_data["storey"] = utils.get_elem_storey(void)
+            void_data["storey"] = void_storeys.get(ifc_guid, "")
             # ifc_guid = bim_obj_props["attributes"][0].items()[-1][-1]
             # ifc_guid = [d for d in pl if d.get("name") == "GlobalId"]
             # ifc_desc = [d for d in pl if d.get("name") == "Description"]
@@ -655,13 +920,10 @@ def merge_plancal_data(objs):
 
 
 @utils.timing
-def get_voids_and_discipline_elems(discipline_model_name):
+def get_voids_and_discipline_elems(discipline_name, model_name):
     bpy.ops.object.select_all(action='DESELECT')
     voids = utils.get_elems_by_name("IfcBuildingElementProxy/ProvisionForVoid")
-    discipline_elems = utils.get_elems_by_param_values(
-        discipline_model_name,
-        only_key="origin_model",
-    )
+    discipline_elems = elements.get_members(elem_index, discipline_name, model_name)
     discipline_elems = [obj for obj in discipline_elems if getattr(obj, "type") == "MESH"]
     return voids, discipline_elems
 
@@ -749,66 +1011,93 @@ def cache_ifc_in_blend_model(model_paths):
     """
 
 
+def get_mesh_cache(model_path):
+    if settings.MESH_CACHE:
+        return meshes.MeshCache.for_model(model_path, settings.MESH_CACHE_MAX_MB)
+
+
+def save_mesh_cache(mesh_cache, discipline_name):
+    if not mesh_cache:
+        return
+    mesh_cache.report(discipline_name)
+    mesh_cache.save()
+
+
 @utils.timing
 def process_voids(discipline_name, model_path):
     global void_proxies
-    global tri_proxy_void_map
-    load_ifc(
+    global void_storeys
+    new_objs = load_ifc(
         model_path,
         import_filter=IFC_SELECTORS[discipline_name]["filter"  ],
         selector=IFC_SELECTORS[     discipline_name]["selector"],
     )
     move_link_to_collection(discipline_name)
-    utils.tag_new_elements_with_model_name(discipline_name, model_path.name)
+    new_objs = utils.tag_new_elements_with_model_name(discipline_name, model_path.name, new_objs)
+    elements.add_elems(elem_index, new_objs, discipline_name, model_path.name)
     voids = utils.get_elems_by_name("ProvisionForVoid")
     colorize_elements(elems=voids, color=colors.COL_MAP[discipline_name])
     # add_elems_to_collection(voids, discipline_name)
-    cx, dups, pairs = get_void_void_bbox_intersection_and_duplicates(voids)
+    cx, dups, pairs = get_void_void_bbox_intersection_and_duplicates(
+        voids,
+        brute_force=settings.VOID_VOID_BRUTE_FORCE,
+        tolerance=settings.VOID_DUPLICATE_TOLERANCE,
+    )
     remove_duplicate_voids(pairs)
     voids = [elem for elem in bpy.context.scene.objects if PROV_VOID_ID in elem.name]
-    generate_void_proxies(voids)
+    void_storeys = storeys.get_storey_map(
+        model_path,
+        voids,
+        [elements.get_guid(elem_index, void) for void in voids],
+        [obj for obj in new_objs if obj.name.startswith(storeys.STOREY_PREFIX)],
+    )
     merge_plancal_data(voids)
     bpy.ops.object.select_all(action='DESELECT')
-    void_proxies = utils.get_elems_by_name("tri_void_proxy")
-    utils.tag_new_elements_with_model_name("PRX", "tri_void_proxy_generated")
-    colorize_elements(elems=void_proxies, color=colors.COL_MAP["PRX"])
-    # void_proxies = [elem for elem in bpy.context.scene.objects if "tri_void_proxy" in elem.name]
-    tri_proxy_void_map = create_void_tri_proxy_map(void_proxies)
+    if settings.DEBUG_VOID_PROXY_OBJECTS:
+        generate_void_proxies(voids)
+        void_proxies = utils.get_elems_by_name("tri_void_proxy")
+        utils.tag_new_elements_with_model_name("PRX", "tri_void_proxy_generated", void_proxies)
+        colorize_elements(elems=void_proxies, color=colors.COL_MAP["PRX"])
+    build_void_collision(voids)
     bpy.ops.object.select_all(action='DESELECT')
     print(f"model name: {model_path.name}")
-    return get_void_bboxes(voids)
+    return index_voids(voids)
 
 
 @utils.timing
-def process_eng_ifc(discipline_name, model_path, delete_non_colliding=False):
+def process_eng_ifc(discipline_name, model_path, delete_non_colliding=None):
     print(f"\nprocess_eng_ifc {discipline_name} start")
-    linked_blend_model = link_blend_ifc(model_path, discipline_name)
+    linked_objs = link_blend_ifc(model_path, discipline_name)
+    linked_blend_model = linked_objs is not None
+    new_objs = linked_objs or []
     if not linked_blend_model:
-        load_ifc(
+        new_objs = load_ifc(
             model_path,
             import_filter=IFC_SELECTORS[discipline_name]["filter"  ],
             selector=IFC_SELECTORS[     discipline_name]["selector"],
         )
-        utils.tag_new_elements_with_model_name(discipline_name, model_path.name)
+        new_objs = utils.tag_new_elements_with_model_name(discipline_name, model_path.name, new_objs)
+    elements.add_elems(elem_index, new_objs, discipline_name, model_path.name)
+    voids, discipline_elems = get_voids_and_discipline_elems(discipline_name, model_path.name)
+    print(f"got {len(discipline_elems)} discipline_elems")
+    if delete_non_colliding is None:
+        delete_non_colliding = not linked_blend_model and \
+            len(discipline_elems) >= settings.CULL_NON_COLLIDING_MIN_ELEMS
     if delete_non_colliding:
-        voids, discipline_elems = get_voids_and_discipline_elems(model_path.name)
-        objs_to_delete = find_non_void_intersecting_elems(
-            elements=discipline_elems,
-            voids=voids,
-        )
+        intersecting = get_void_overlap_flags(discipline_elems)
+        objs_to_delete = [e for e, cx in zip(discipline_elems, intersecting) if not cx]
+        discipline_elems = [e for e, cx in zip(discipline_elems, intersecting) if cx]
         delete_objects(objs_to_delete)
-    voids, discipline_elems = get_voids_and_discipline_elems(model_path.name)
-    print(f"got {len(discipline_elems)} discipline_elems")
     if not linked_blend_model:
         if discipline_name != "BR":
             colorize_elements(elems=discipline_elems, color=colors.COL_MAP[discipline_name])
         # move_link_to_collection(discipline_name)
         add_elems_to_collection(discipline_elems, discipline_name)
     print(f"still got {len(discipline_elems)} discipline_elems")
+    mesh_cache = get_mesh_cache(model_path)
     map_void_data_by_collision(
-        set_a=void_proxies,
+        set_a=voids,
         set_b=discipline_elems,
-        void_proxies=True,
         map_ifc_classes=True,
         attrib_keys={
             "attributes": [
@@ -836,7 +1125,9 @@ def process_eng_ifc(discipline_name, model_path, delete_non_colliding=False):
             ],
         },
         value_replace_map=utils.PIPE_MAT_MAP,
+        mesh_cache=mesh_cache,
     )
+    save_mesh_cache(mesh_cache, discipline_name)
     bpy.ops.object.select_all(action='DESELECT')
     print(f"model name: {model_path.name}")
     return voids
@@ -845,52 +1136,83 @@ def process_eng_ifc(discipline_name, model_path, delete_non_colliding=False):
 @utils.timing
 def process_arc_ifc(discipline_name, model_path):
     print(f"\nprocess_arc_ifc {discipline_name} start")
-    global void_bboxes
-    linked_blend_model = link_blend_ifc(model_path, discipline_name)
+    linked_objs = link_blend_ifc(model_path, discipline_name)
+    linked_blend_model = linked_objs is not None
+    new_objs = linked_objs or []
     if not linked_blend_model:
-        load_ifc(
+        new_objs = load_ifc(
             model_path,
             import_filter=IFC_SELECTORS[discipline_name]["filter"],
             selector=IFC_SELECTORS[     discipline_name]["selector"],
         )
-        utils.tag_new_elements_with_model_name(discipline_name, model_path.name)
-    voids, discipline_elems = get_voids_and_discipline_elems(model_path.name)
+        new_objs = utils.tag_new_elements_with_model_name(discipline_name, model_path.name, new_objs)
+    elements.add_elems(elem_index, new_objs, discipline_name, model_path.name)
+    voids, discipline_elems = get_voids_and_discipline_elems(discipline_name, model_path.name)
+    elem_rows = elements.get_rows(elem_index, discipline_elems)
     print(f"got {len(discipline_elems)} discipline_elems")
-    void_bboxes = get_void_bboxes(voids)
     if not linked_blend_model:
         # move_link_to_collection(discipline_name)
         add_elems_to_collection(discipline_elems, discipline_name)
-    walls = [elem for elem in discipline_elems if elem.name.startswith("IfcWall")]
+    walls = [
+        elem for elem, row in zip(discipline_elems, elem_rows)
+        if elem_index.classes[row].startswith("IfcWall")
+    ]
     print(f"got {len(walls)} walls")
-    map_void_data_by_collision(
-        set_a=void_proxies,
-        set_b=walls,
-        void_proxies=True,
-        attrib_keys = {
-            "attributes": [
-                "Name:->:WallName",
-            ],
-        },
-        pset_keys={
-            # "Bauteilbenennung": ["Mehrschichtiger Aufbau Typ"],
-            # "Pset_WallCommon"  : ["FireRating"],
-        },
-        map_materials=True,
-    )
-    spaces = [elem for elem in discipline_elems if elem.name.startswith("IfcSpace")]
+    mesh_cache = get_mesh_cache(model_path)
+    wall_keys = {
+        "attributes": [
+            "Name:->:WallName",
+        ],
+    }
+    if settings.WALL_FOOTPRINT_LOOKUP:
+        map_void_data_by_footprint(
+            set_a=voids,
+            set_b=walls,
+            oriented=True,
+            attrib_keys=wall_keys,
+            map_materials=True,
+            mesh_cache=mesh_cache,
+        )
+    else:
+        map_void_data_by_collision(
+            set_a=voids,
+            set_b=walls,
+            attrib_keys=wall_keys,
+            pset_keys={
+                # "Bauteilbenennung": ["Mehrschichtiger Aufbau Typ"],
+                # "Pset_WallCommon"  : ["FireRating"],
+            },
+            map_materials=True,
+            mesh_cache=mesh_cache,
+        )
+    spaces = [
+        elem for elem, row in zip(discipline_elems, elem_rows)
+        if elem_index.classes[row] == "IfcSpace"
+    ]
     print(f"got {len(spaces)} spaces")
-    map_void_data_by_collision(
-        set_a=void_proxies,
-        set_b=spaces,
-        void_proxies=True,
-        attrib_keys = {
-            "attributes": [
-                f"GlobalId:->:{discipline_name}_RoomGuids",
-                f"Name:->:{discipline_name}_RoomNames",
-                f"LongName:->:{discipline_name}_RoomLongNames",
-            ],
-        },
-    )
+    room_keys = {
+        "attributes": [
+            f"GlobalId:->:{discipline_name}_RoomGuids",
+            f"Name:->:{discipline_name}_RoomNames",
+            f"LongName:->:{discipline_name}_RoomLongNames",
+        ],
+    }
+    if settings.ROOM_FOOTPRINT_LOOKUP:
+        map_void_data_by_footprint(
+            set_a=voids,
+            set_b=spaces,
+            offset=settings.ROOM_VOID_OFFSET,
+            attrib_keys=room_keys,
+            mesh_cache=mesh_cache,
+        )
+    else:
+        map_void_data_by_collision(
+            set_a=voids,
+            set_b=spaces,
+            attrib_keys=room_keys,
+            mesh_cache=mesh_cache,
+        )
+    save_mesh_cache(mesh_cache, discipline_name)
     print(f"model name: {model_path.name}")
 
 
@@ -898,6 +1220,12 @@ def process_arc_ifc(discipline_name, model_path):
 def process_ifc_models(model_paths: dict, eng_models_paths):
     print("process_ifc_models start")
     global void_bboxes
+    global elem_index
+    elem_index = elements.new_index()
+    obb_pair_counts.clear()
+    utils.reset_material_cache()
+    elem_hulls.clear()
+    void_values.clear()
 
     #cache_ifc_in_blend_model(model_paths)
     #return
@@ -914,6 +1242,9 @@ def process_ifc_models(model_paths: dict, eng_models_paths):
         process_arc_ifc("A", model_paths["A"])
 
     # unlink_ifc_collections()
+    report_obb_pair_counts()
+    utils.report_material_cache()
+    flush_void_data(utils.get_elems_by_name(PROV_VOID_ID))
     utils.set_3dview_to_all()
     utils.toggle_expand(2)
 
@@ -923,11 +1254,22 @@ def process_ifc_models(model_paths: dict, eng_models_paths):
     write_void_data_to_csv(csv_void_table)
 
 
-void_bboxes = {}
+elem_index = elements.new_index()
+void_bboxes = bboxes.get_bounds_table([])
+obb_pair_counts = collections.Counter()
+elem_hulls = {}
+void_values = {}
 void_proxies = []
-tri_proxy_void_map = {}
+void_storeys = {}
+void_collision = None
 
 Bbox = namedtuple("Bbox", "pts min max centroid")
+VoidCollision = namedtuple(
+    "VoidCollision",
+    "backends voids guids geometries boxes bounds grid",
+)
+MappingStep = namedtuple("MappingStep", "source pset key target value_map")
+EMPTY_MESH = (np.empty((0, 3)), np.empty((0, 3), dtype=np.int64))
 PROV_VOID_ID = "IfcBuildingElementProxy/ProvisionForVoid"
 
 IFC_FLOW_SEGMENTS = {